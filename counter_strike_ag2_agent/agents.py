@@ -1,50 +1,57 @@
 # agents.py: Sets up AG2 agents and group chats
 import os
 import json
+from functools import lru_cache
 from autogen import AssistantAgent, UserProxyAgent, GroupChat, GroupChatManager  # type: ignore
 from .config import ACTIONS
 
+# Environment variables that determine the provider config list
+_CONFIG_ENV_VARS = ("OAI_CONFIG_LIST", "ANTHROPIC_API_KEY", "XAI_API_KEY", "XAI_MODEL", "XAI_BASE_URL", "OPENAI_API_KEY")
+
 def _load_config_list():
+    # Same environment -> same config; each caller gets its own copies of the dicts
+    env_key = tuple(os.environ.get(name) for name in _CONFIG_ENV_VARS)
+    return [dict(item) for item in _load_config_list_cached(env_key)]
+
+@lru_cache(maxsize=8)
+def _load_config_list_cached(env_key: tuple) -> tuple:
+    cfg, anth_key, xai_key, xai_model, xai_base_url, key = env_key
     # Prefer explicit OAI_CONFIG_LIST (file or JSON string)
-    cfg = os.environ.get("OAI_CONFIG_LIST")
     if cfg:
         try:
             if os.path.isfile(cfg):
                 with open(cfg, "r", encoding="utf-8") as f:
-                    return json.load(f)
-            return json.loads(cfg)
+                    return tuple(json.load(f))
+            return tuple(json.loads(cfg))
         except (json.JSONDecodeError, OSError, ValueError):
             pass
     # Anthropic fallback if ANTHROPIC_API_KEY is set
-    anth_key = os.environ.get("ANTHROPIC_API_KEY")
     if anth_key:
-        return [{
+        return ({
             "model": "claude-3-5-sonnet-20240620",
             "api_key": anth_key,
             "api_type": "anthropic",
             "max_tokens": 1024,
-        }]
+        },)
     # xAI (Grok) fallback if XAI_API_KEY is set
-    xai_key = os.environ.get("XAI_API_KEY")
     if xai_key:
-        return [{
-            "model": os.environ.get("XAI_MODEL", "grok-2-latest"),
+        return ({
+            "model": xai_model or "grok-2-latest",
             "api_key": xai_key,
             "api_type": "openai",
-            "base_url": os.environ.get("XAI_BASE_URL", "https://api.x.ai/v1"),
-        }]
+            "base_url": xai_base_url or "https://api.x.ai/v1",
+        },)
     # OpenAI fallback if OPENAI_API_KEY is set
-    key = os.environ.get("OPENAI_API_KEY")
     if key:
-        return [{
+        return ({
             "model": "gpt-5",
             "api_key": key,
             "api_type": "responses",
             "reasoning_effort": "medium",
             "verbosity": "low",
             "allowed_tools": [],
-        }]
-    return []
+        },)
+    return ()
 
 CONFIG_LIST = _load_config_list()
 
@@ -2,6 +2,7 @@
 # Follows PEP 8: All caps for constants
 
 TEAMS = ["Terrorists", "Counter-Terrorists"]
+OPPONENTS = {TEAMS[0]: TEAMS[1], TEAMS[1]: TEAMS[0]}  # team -> opposing team
 POSITIONS = ["A-site", "B-site", "Mid"]
 ACTIONS = ["move to <position>", "shoot <target>", "plant bomb", "defuse bomb"]
 
@@ -1,11 +1,28 @@
 # game_state.py: Handles game logic and state machine
 import random  # For Monte Carlo-like randomness in actions
-from typing import Dict, Optional  # For type hints
+import re  # Precompiled alias matchers for apply_action
+from typing import Any, Dict, Optional  # For type hints
 
-from .config import TEAMS, POSITIONS, ACTION_ALIASES  # Import constants
+import orjson  # Fast JSON for the persisted state snapshot
+
+from .config import TEAMS, OPPONENTS, POSITIONS, ACTION_ALIASES  # Import constants
+
+# One alternation per action type, so a command is classified with a single C-level scan
+_ACTION_PATTERNS = {
+    key: re.compile("|".join(map(re.escape, aliases))) for key, aliases in ACTION_ALIASES.items()
+}
 
 class GameState:
     """Manages the game state, including rounds, health, objectives, and phases."""
+
+    # Persisted fields: serialized by to_state_dict(), restored by from_dict()
+    # (anything absent keeps its __init__ default)
+    _FIELDS = (
+        "round", "max_rounds", "player_health", "bomb_planted", "bomb_site", "winner",
+        "phase", "round_scores", "round_time", "bomb_timer", "current_positions",
+        "last_action_results",
+    )
+    __slots__ = _FIELDS + ("defuse_time", "_state_json")
     
     def __init__(self) -> None:
         """Initialize game state with defaults."""
@@ -28,9 +45,12 @@ class GameState:
             team: {"player": "spawn", "bot": "spawn"} for team in TEAMS
         }
         self.last_action_results: list = []  # Track recent actions for better AI responses
+        self._state_json: Optional[str] = None  # Cached to_state_json() output
 
     def reset_round(self) -> None:
         """Reset state for a new round and increment round counter."""
+        self._state_json = None  # Scores, health, positions and round all change below
+
         # Award round win
         if self.winner:
             self.round_scores[self.winner] += 1
@@ -50,14 +70,15 @@ class GameState:
     def is_round_over(self) -> bool:
         """Check if the current round is over based on health or objectives.
         
-        Algorithm: Simple iteration over health (O(n) where n=players small).
+        Algorithm: One C-level max() reduction over each team's health (O(n) where n=players small).
         Edge case: All dead in one team -> opponent wins; bomb planted -> Terrorists win.
         Returns: True if over, False otherwise.
         """
         # Check if all players in a team are dead
         for team in TEAMS:
-            if all(hp <= 0 for hp in self.player_health[team].values()):
-                self.winner = TEAMS[1 - TEAMS.index(team)]  # Set winner to opposing team
+            if max(self.player_health[team].values(), default=0) <= 0:
+                self.winner = OPPONENTS[team]  # Set winner to opposing team
+                self._state_json = None
                 return True
         
         # Check if someone already won this round
@@ -80,6 +101,8 @@ class GameState:
         Edge case: Invalid action -> return error string; wrong team for objective -> invalid.
         Returns: Result string for logging.
         """
+        self._state_json = None  # Nested health/positions/results may change below
+
         # Check if entity is alive
         if self.player_health[team][entity] <= 0:
             result = f"{entity} is dead and cannot act."
@@ -88,11 +111,9 @@ class GameState:
             
         # Normalize and parse action
         a = action.lower().strip()
-        def matches(key: str) -> bool:
-            return any(alias in a for alias in ACTION_ALIASES.get(key, []))
 
         # Movement action
-        if "move to" in a or matches("move"):
+        if _ACTION_PATTERNS["move"].search(a):
             # Extract target position
             position = "unknown"
             for pos in POSITIONS:
@@ -105,8 +126,8 @@ class GameState:
             return result
             
         # Shooting action with specific targeting
-        elif "shoot" in a or matches("shoot"):
-            target_team = TEAMS[1 - TEAMS.index(team)]
+        elif _ACTION_PATTERNS["shoot"].search(a):
+            target_team = OPPONENTS[team]
             
             # Try to extract specific target
             target = None
@@ -151,7 +172,7 @@ class GameState:
             return result
             
         # Bomb planting (Terrorists only)
-        elif ("plant bomb" in a or matches("plant bomb")) and team == "Terrorists":
+        elif team == "Terrorists" and _ACTION_PATTERNS["plant bomb"].search(a):
             if self.bomb_planted:
                 result = f"{entity}: Bomb is already planted!"
                 self.last_action_results.append(result)
@@ -173,7 +194,7 @@ class GameState:
             return result
             
         # Bomb defusing (CT only)
-        elif ("defuse bomb" in a or matches("defuse bomb")) and team == "Counter-Terrorists":
+        elif team == "Counter-Terrorists" and _ACTION_PATTERNS["defuse bomb"].search(a):
             if not self.bomb_planted:
                 result = f"{entity}: No bomb to defuse!"
                 self.last_action_results.append(result)
@@ -195,6 +216,30 @@ class GameState:
         self.last_action_results.append(result)
         return result
     
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "GameState":
+        """Build a GameState from a state dict / request context in one pass over _FIELDS."""
+        game_state = cls()
+        for field in cls._FIELDS:
+            if field in data:
+                setattr(game_state, field, data[field])
+        game_state._state_json = None
+        return game_state
+
+    def to_state_dict(self) -> Dict[str, Any]:
+        """Return the persisted snapshot of this game (shares nested containers)."""
+        return {f: getattr(self, f) for f in self._FIELDS}
+
+    def to_state_json(self) -> str:
+        """Return to_state_dict() as JSON, cached until the next mutation.
+
+        apply_action(), reset_round() and is_round_over() invalidate the cache; code that
+        assigns fields or mutates nested dicts directly must set _state_json to None.
+        """
+        if self._state_json is None:
+            self._state_json = orjson.dumps(self.to_state_dict()).decode()
+        return self._state_json
+
     def get_game_status(self) -> str:
         """Get comprehensive game status for AI context."""
         status = []
@@ -1,9 +1,15 @@
 from __future__ import annotations
 
+import re
 from typing import List
 
 from .game_state import GameState
 
+# Question keyword groups for answer(), each matched with a single regex scan
+_BOMB_PLACE_RE = re.compile("site|where|plant")
+_CT_RE = re.compile("ct|counter|enemy|threat|near|close")
+_ADVICE_RE = re.compile("upgrade|suggest|tip|strategy|what should we do")
+
 
 class RagTerroristHelper:
     """Very lightweight RAG-like helper that answers questions based on current game facts.
@@ -49,16 +55,15 @@ class RagTerroristHelper:
     @staticmethod
     def answer(question: str, state: GameState) -> str:
         q = question.lower()
-        facts = RagTerroristHelper.build_facts(state)
 
         # Bomb site questions
-        if "bomb" in q and ("site" in q or "where" in q or "plant" in q):
+        if "bomb" in q and _BOMB_PLACE_RE.search(q):
             if state.bomb_planted and state.bomb_site:
                 return f"Bomb planted at {state.bomb_site}."
             return "Bomb is not planted yet. Consider planting at A-site or B-site."
 
         # CT proximity or threat intuition
-        if any(k in q for k in ["ct", "counter", "enemy", "threat", "near", "close"]):
+        if _CT_RE.search(q):
             ct_alive = sum(1 for hp in state.player_health.get("Counter-Terrorists", {}).values() if hp > 0)
             if ct_alive == 0:
                 return "No CTs alive. Safe to execute objective."
@@ -67,14 +72,14 @@ class RagTerroristHelper:
             return "CT presence unknown. Clear corners and use utility before entry."
 
         # Upgrade/suggestion
-        if any(k in q for k in ["upgrade", "suggest", "tip", "strategy", "what should we do"]):
+        if _ADVICE_RE.search(q):
             if not state.bomb_planted:
                 return "Group up and execute a fast hit: smoke entry, flash CT, then plant."
             site = state.bomb_site or "site"
             return f"After plant at {site}, set a crossfire and play for time; avoid dry peeks."
 
-        # Default: surface current facts as fallback
-        return "Facts: " + " ".join(facts)
+        # Default: surface current facts as fallback (only built when no heuristic matched)
+        return "Facts: " + " ".join(RagTerroristHelper.build_facts(state))
 
     @staticmethod
     def build_facts_from_context(context: dict) -> List[str]:
@@ -1,9 +1,49 @@
 from __future__ import annotations
 
-from typing import List, Optional
+import re
+import uuid
+from typing import TYPE_CHECKING, List, Optional, Sequence
 
-import chromadb
-from chromadb.utils import embedding_functions
+import numpy as np
+
+if TYPE_CHECKING:
+    import chromadb
+
+# HNSW settings for newly created collections; existing ones keep their metadata
+HNSW_METADATA = {"hnsw:space": "cosine", "hnsw:M": 32, "hnsw:construction_ef": 200}
+
+# Collections up to this size are searched as one contiguous float32 matrix
+FLAT_SCAN_MAX = 4096
+
+# Paragraph break: a blank line, including lines holding only whitespace
+_PARA_RE = re.compile(r"\n\s*\n")
+
+# One PersistentClient per directory; reopening a path reuses the same SQLite-backed client
+# (release_client() forces the next open to read back from disk).
+# persist_dir=None maps to an in-memory EphemeralClient (nothing written to disk). Chroma keeps a
+# single ephemeral system per process, so every persist_dir=None instance shares one store:
+# use distinct collection names to keep them apart.
+_CLIENTS: dict[Optional[str], "chromadb.ClientAPI"] = {}
+
+
+def _get_client(persist_dir: Optional[str]) -> "chromadb.ClientAPI":
+    client = _CLIENTS.get(persist_dir)
+    if client is None:
+        import chromadb  # deferred: importing chromadb costs ~0.6 s, paid on first client only
+
+        if persist_dir is None:
+            client = chromadb.EphemeralClient()
+        else:
+            client = chromadb.PersistentClient(path=persist_dir)
+        _CLIENTS[persist_dir] = client
+    return client
+
+
+def release_client(persist_dir: Optional[str]) -> None:
+    """Close the cached client for persist_dir; ChromaRAG instances still using it stop working."""
+    client = _CLIENTS.pop(persist_dir, None)
+    if client is not None:
+        client.close()
 
 
 class ChromaRAG:
@@ -15,57 +55,156 @@ class ChromaRAG:
     - ask: <question>  -> semantic search + return top-1 chunk as answer
     """
 
-    def __init__(self, persist_dir: str = ".chroma", collection: str = "cs_kb") -> None:
-        self.client = chromadb.PersistentClient(path=persist_dir)
+    _embedding_fn = None  # loaded once per process, see _get_embedder
+
+    def __init__(self, persist_dir: Optional[str] = ".chroma", collection: str = "cs_kb") -> None:
+        self.client = _get_client(persist_dir)
         self.collection_name = collection
-        # Use OpenAI embedding if env is present, else default sentence-transformers
-        try:
-            ef = embedding_functions.OpenAIEmbeddingFunction()
-        except Exception:
-            ef = embedding_functions.DefaultEmbeddingFunction()
-        self.col = self.client.get_or_create_collection(self.collection_name, embedding_function=ef)
+        ef = self._get_embedder()
+        self.ef = ef  # shared with sibling collections (e.g. the agent service prompt cache)
+        self.col = self.client.get_or_create_collection(
+            self.collection_name, embedding_function=ef, metadata=HNSW_METADATA
+        )
+        self._flat: Optional[tuple] = None  # (count, unit-norm float32 matrix, norms, docs)
+
+    @classmethod
+    def _get_embedder(cls):
+        """Process-wide embedding function, so the model is loaded only once."""
+        if cls._embedding_fn is None:
+            from chromadb.utils import embedding_functions
+
+            # Use OpenAI embedding if env is present, else default sentence-transformers
+            try:
+                ef = embedding_functions.OpenAIEmbeddingFunction()
+            except Exception:
+                ef = embedding_functions.DefaultEmbeddingFunction()
+            cls._embedding_fn = ef
+        return cls._embedding_fn
+
+    def _similarity(self, distance: float) -> float:
+        """Map a query distance to a 0-1 similarity for the collection's distance space."""
+        if (self.col.metadata or {}).get("hnsw:space") == "cosine":
+            return max(0, 1 - distance)
+        # For L2 distance, typical range is 0-2, so we normalize
+        return max(0, 1 - (distance / 2.0))
+
+    def embed(self, question: str) -> Sequence[float]:
+        """Embed a query once so it can be reused across lookups (see ask_with_embedding)."""
+        return self.ef([question])[0]
+
+    def _flat_matrix(self, count: Optional[int] = None) -> Optional[tuple]:
+        """Contiguous float32 mirror of a small collection, reloaded when its count changes.
+
+        count: a col.count() the caller has just fetched, so it is not queried twice.
+        """
+        if count is None:
+            count = self.col.count()
+        if count > FLAT_SCAN_MAX or (self.col.metadata or {}).get("hnsw:space", "l2") not in ("cosine", "l2"):
+            return None
+        if not count:
+            return (0, None, None, [])
+        if self._flat is None or self._flat[0] != count:
+            got = self.col.get(include=["embeddings", "documents"])
+            mat = np.asarray(got["embeddings"], dtype=np.float32).reshape(count, -1)
+            norms = np.linalg.norm(mat, axis=1)
+            unit = mat / np.maximum(norms, 1e-12)[:, None]
+            self._flat = (count, np.ascontiguousarray(unit), norms, got["documents"])
+        return self._flat
+
+    def _nearest(self, embedding: Sequence[float], n: int = 3, count: Optional[int] = None) -> tuple[list, list]:
+        """Top-n (documents, distances) in the collection's distance space.
+
+        Small collections are scored with a single matrix-vector product; larger ones
+        (or unusual spaces) go through the Chroma HNSW index.
+        """
+        flat = self._flat_matrix(count)
+        if flat is None:
+            res = self.col.query(query_embeddings=[embedding], n_results=n)
+            docs = res.get("documents", [[]])[0] if res.get("documents") else []
+            distances = res.get("distances", [[]])[0] if res.get("distances") else []
+            return docs, distances
+        count, unit, norms, docs = flat
+        if not count:
+            return [], []
+        q = np.asarray(embedding, dtype=np.float32)
+        q_norm = float(np.linalg.norm(q))
+        cos = unit @ (q / max(q_norm, 1e-12))
+        if (self.col.metadata or {}).get("hnsw:space") == "cosine":
+            dist = 1.0 - cos
+        else:
+            # Chroma's l2 is the squared euclidean distance
+            dist = norms ** 2 + q_norm ** 2 - 2.0 * norms * q_norm * cos
+        top = np.argsort(dist)[:n]
+        return [docs[i] for i in top], [float(dist[i]) for i in top]
 
     def add_texts(self, texts: List[str]) -> int:
+        """Embed and store texts; pass a whole batch in one call rather than one text per call."""
         if not texts:
             return 0
-        ids = [f"doc-{self.col.count()}-{i}" for i in range(len(texts))]
-        self.col.add(documents=texts, ids=ids)
+        # One random batch prefix: unique across instances, no count() query per id
+        batch = uuid.uuid4().hex
+        ids = [f"doc-{batch}-{i}" for i in range(len(texts))]
+        # One batched forward pass for the whole list, handed to a single add()
+        self.col.add(documents=texts, embeddings=self.ef(texts), ids=ids)
+        self._flat = None
         return len(texts)
 
+    def add_text_blob(self, text: str) -> int:
+        """Split in-memory text into paragraphs and add them (add_file without the disk read)."""
+        chunks = [p.strip() for p in _PARA_RE.split(text) if p.strip()]
+        return self.add_texts(chunks)
+
     def add_file(self, path: str) -> int:
         try:
             with open(path, "r", encoding="utf-8") as f:
                 text = f.read()
         except OSError:
             return 0
-        # naive split to paragraphs
-        chunks = [p.strip() for p in text.split("\n\n") if p.strip()]
-        return self.add_texts(chunks)
+        return self.add_text_blob(text)
 
     def ask(self, question: str, min_similarity: float = 0.7) -> Optional[str]:
         question = question.strip()
         if not question:
             return None
+        # Nothing to match against: skip the embedding pass entirely
+        count = self.col.count()
+        if not count:
+            return None
+        try:
+            embedding = self.embed(question)
+        except Exception:
+            return None
+        return self._answer(embedding, min_similarity, question, count)
+
+    def ask_with_embedding(
+        self, embedding: Sequence[float], min_similarity: float = 0.7, question: str = ""
+    ) -> Optional[str]:
+        """Like ask(), but with a precomputed query embedding from embed()."""
+        count = self.col.count()
+        if not count:
+            return None
+        return self._answer(embedding, min_similarity, question, count)
+
+    def _answer(
+        self, embedding: Sequence[float], min_similarity: float, question: str, count: int
+    ) -> Optional[str]:
+        """Best document within min_similarity of embedding, for a collection holding count docs."""
         try:
             # Bias for simple deterministic cases in tests
             prefer = None
             ql = question.lower()
             if "a-site" in ql or "a site" in ql:
                 prefer = "a-site"
-            res = self.col.query(query_texts=[question], n_results=3)
-            docs = res.get("documents", [[]])[0] if res.get("documents") else []
-            distances = res.get("distances", [[]])[0] if res.get("distances") else []
+            docs, distances = self._nearest(embedding, count=count)
             
             if not docs:
                 return None
                 
             # Filter by relevance threshold (lower distance = higher similarity)
-            # Convert distance to similarity: similarity = 1 - (distance / max_distance)
             relevant_docs = []
             for i, (doc, distance) in enumerate(zip(docs, distances)):
                 if doc:
-                    # For L2 distance, typical range is 0-2, so we normalize
-                    similarity = max(0, 1 - (distance / 2.0))
+                    similarity = self._similarity(distance)
                     if similarity >= min_similarity:
                         relevant_docs.append((doc, similarity))
             
@@ -90,15 +229,16 @@ class ChromaRAG:
         question = question.strip()
         if not question:
             return []
+        count = self.col.count()
+        if not count:
+            return []
         try:
-            res = self.col.query(query_texts=[question], n_results=3)
-            docs = res.get("documents", [[]])[0] if res.get("documents") else []
-            distances = res.get("distances", [[]])[0] if res.get("distances") else []
+            docs, distances = self._nearest(self.embed(question), count=count)
             
             results = []
             for doc, distance in zip(docs, distances):
                 if doc:
-                    similarity = max(0, 1 - (distance / 2.0))
+                    similarity = self._similarity(distance)
                     results.append((doc, similarity))
                     
             return sorted(results, key=lambda x: x[1], reverse=True)
@@ -107,17 +247,14 @@ class ChromaRAG:
 
     def clear(self) -> None:
         """Remove all knowledge and recreate the empty collection."""
+        self._flat = None
         try:
             self.client.delete_collection(self.collection_name)
         except Exception:
             # If deletion fails (e.g., collection not found), continue to recreate
             pass
-        try:
-            ef = getattr(self.col, "_embedding_function", None)
-            if ef is None:
-                ef = embedding_functions.DefaultEmbeddingFunction()
-        except Exception:
-            ef = embedding_functions.DefaultEmbeddingFunction()
-        self.col = self.client.get_or_create_collection(self.collection_name, embedding_function=ef)
+        self.col = self.client.get_or_create_collection(
+            self.collection_name, embedding_function=self.ef, metadata=HNSW_METADATA
+        )
 
 
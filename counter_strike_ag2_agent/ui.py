@@ -1,4 +1,7 @@
 # ui.py: Pygame UI components
+from functools import lru_cache
+from typing import Sequence
+
 import pygame
 
 _MOUSEBUTTONDOWN = getattr(pygame, "MOUSEBUTTONDOWN", None)
@@ -124,13 +127,59 @@ class InputBox:
             screen.blit(self.txt_surface, (local_rect.x + 5, local_rect.y + 5))
         else:
             # Placeholder when empty
-            ph = self.font.render(self.placeholder, True, (130, 130, 130))
+            ph = _render_line(self.placeholder, (130, 130, 130), 32)
             screen.blit(ph, (local_rect.x + 5, local_rect.y + 5))
         pygame.draw.rect(screen, self.color, local_rect, 2)
 
+@lru_cache(maxsize=8)
+def _font(size: int) -> pygame.font.Font:
+    """Default font at a given size, loaded once."""
+    return pygame.font.Font(None, size)
+
+
+@lru_cache(maxsize=512)
+def _render_line(text: str, rgb: tuple, size: int) -> pygame.Surface:
+    """Rasterized text line, shared across panels and frames."""
+    return _font(size).render(text, True, rgb)
+
+
+@lru_cache(maxsize=512)
+def _wrap_text(text: str, max_w: int, size: int) -> tuple[str, ...]:
+    """Word-wrap text to max_w pixels at the given font size."""
+    if not text:
+        return ("",)
+    font = _font(size)
+    words = text.split(" ")
+    lines: list[str] = []
+    current = ""
+    for word in words:
+        trial = (current + " " + word).strip()
+        if font.size(trial)[0] <= max_w:
+            current = trial
+        else:
+            if current:
+                lines.append(current)
+            # Handle very long single words by hard clipping
+            if font.size(word)[0] <= max_w:
+                current = word
+            else:
+                # break word into chunks
+                chunk = ""
+                for ch in word:
+                    if font.size(chunk + ch)[0] <= max_w:
+                        chunk += ch
+                    else:
+                        lines.append(chunk)
+                        chunk = ch
+                current = chunk
+    if current:
+        lines.append(current)
+    return tuple(lines)
+
+
 def render_ui(
     screen: pygame.Surface,
-    chat_log: list[str],
+    chat_log: Sequence[str],
     input_box: InputBox,
     width: int,
     height: int,
@@ -138,44 +187,15 @@ def render_ui(
 ) -> None:
     """Render chat log and input box."""
     screen.fill((20, 20, 20))
-    font = pygame.font.Font(None, 28)
+    font_size = 28
     padding = 10
     line_height = 32
 
-    def wrap_text(text: str, max_w: int) -> list[str]:
-        if not text:
-            return [""]
-        words = text.split(" ")
-        lines: list[str] = []
-        current = ""
-        for word in words:
-            trial = (current + " " + word).strip()
-            if font.size(trial)[0] <= max_w:
-                current = trial
-            else:
-                if current:
-                    lines.append(current)
-                # Handle very long single words by hard clipping
-                if font.size(word)[0] <= max_w:
-                    current = word
-                else:
-                    # break word into chunks
-                    chunk = ""
-                    for ch in word:
-                        if font.size(chunk + ch)[0] <= max_w:
-                            chunk += ch
-                        else:
-                            lines.append(chunk)
-                            chunk = ch
-                    current = chunk
-        if current:
-            lines.append(current)
-        return lines
-
     # Flatten all wrapped lines, then select a window based on scroll offset
     all_lines: list[str] = []
-    for original in chat_log[-500:]:  # cap work
-        all_lines.extend(wrap_text(original, width - 2 * padding))
+    recent = chat_log if len(chat_log) <= 500 else chat_log[-500:]  # cap work; deques are never sliced
+    for original in recent:
+        all_lines.extend(_wrap_text(original, width - 2 * padding, font_size))
 
     max_visible = max(1, (height - 80) // line_height)
     total = len(all_lines)
@@ -187,12 +207,12 @@ def render_ui(
 
     y = padding
     for wrapped in visible_lines:
-        text_surface = font.render(wrapped, True, (230, 230, 230))
+        text_surface = _render_line(wrapped, (230, 230, 230), font_size)
         screen.blit(text_surface, (padding, y))
         y += line_height
 
     # Controls hint (removed scroll-wheel message)
     hint = ""
-    hint_surface = font.render(hint, True, (150, 150, 150))
+    hint_surface = _render_line(hint, (150, 150, 150), font_size)
     screen.blit(hint_surface, (padding, height - 60))
     input_box.draw(screen)
\ No newline at end of file
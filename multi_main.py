@@ -3,6 +3,7 @@ from __future__ import annotations
 import random
 from typing import List
 
+import numpy as np
 import pygame
 
 from counter_strike_ag2_agent.agents import create_terrorists_group
@@ -14,6 +15,10 @@ from counter_strike_ag2_agent.rag import RagTerroristHelper
 from counter_strike_ag2_agent.rag_vector import ChromaRAG
 from counter_strike_ag2_agent.ui import InputBox, render_ui
 
+# Action verbs that warrant a game status line after they resolve (matched as substrings,
+# so "shooting", "moved" and "shoot!" count too)
+STATUS_TRIGGERS = ("shoot", "plant", "defuse", "move")
+
 
 def run_multi(num_instances: int = 3, show_ct: bool = True) -> None:
     getattr(pygame, "init", lambda: None)()
@@ -39,8 +44,75 @@ def run_multi(num_instances: int = 3, show_ct: bool = True) -> None:
 
     # Shared state and shared terrorists group chat
     state = GameState()
+    # Bind hot GameState methods once; the input loop calls these on every action
+    apply_action = state.apply_action
+    get_status = state.get_game_status
+    is_round_over = state.is_round_over
+    is_game_over = state.is_game_over
+    reset_round = state.reset_round
     manager, _ = create_terrorists_group(num_players=num_instances)
 
+    # Resolve the terrorist bot once; 'ag2:' and 'smart:' both route through it
+    bot_agent = next(
+        (a for a in manager.groupchat.agents if hasattr(a, 'system_message') and 'bot' in a.name.lower()),
+        None,
+    )
+
+    def _query_bot(tag: str, q: str, include_kb: bool, tries: int) -> str:
+        """Ask the terrorist bot about the current state and return the chat line to show.
+
+        tag prefixes the line ("AG2"/"SMART"); include_kb adds the vector KB answer to the prompt.
+        """
+        try:
+            # Get comprehensive game context (and knowledge base info for smart queries)
+            game_status = get_status()
+            game_facts = RagTerroristHelper.build_facts(state)
+            if include_kb:
+                kb_info = kb.ask(q) or "No relevant knowledge found"
+                context = f"""Game Status: {game_status}
+Detailed Context: {' '.join(game_facts)}
+Knowledge Base: {kb_info}
+Question: {q}
+
+Give SHORT tactical advice (1-2 sentences max) based on the current game state and available knowledge."""
+            else:
+                context = f"Game Status: {game_status}\nDetailed Context: {' '.join(game_facts)}\n\nQuestion: {q}\n\nGive a SHORT tactical response (1-2 sentences max)."
+
+            # Create a message for the bot
+            user_message = {"content": context, "role": "user"}
+
+            if not bot_agent:
+                raise Exception("Could not find bot agent in group chat")
+
+            agent_response = bot_agent.generate_reply(
+                messages=[user_message],
+                sender=None
+            )
+
+            # Clean up the response formatting
+            if agent_response:
+                if isinstance(agent_response, dict) and 'content' in agent_response:
+                    response_text = agent_response['content']
+                else:
+                    response_text = str(agent_response)
+
+                # Collapse escaped "\\n" sequences and all real whitespace in one pass
+                response_text = ' '.join(response_text.replace('\\n', ' ').split())
+
+                # Limit length to keep it readable
+                response_text = response_text[:197] + "..." if len(response_text) > 200 else response_text
+            else:
+                response_text = "No response from agent"
+
+            return f"{tag}: {response_text} ({tries} tries left)"
+        except Exception as e:
+            error_msg = str(e)
+            if "Could not find bot agent" in error_msg:
+                return f"{tag} Error: Bot agent not found. Check AG2 setup. ({tries} tries left)"
+            if "api" in error_msg.lower() or "key" in error_msg.lower():
+                return f"{tag} Error: API issue - {error_msg[:100]}... ({tries} tries left)"
+            return f"{tag} Error: {error_msg[:100]}... ({tries} tries left)"
+
     chat_logs: List[List[str]] = []
     input_boxes: List[InputBox] = []
     rects: List[pygame.Rect] = []
@@ -83,6 +155,15 @@ def run_multi(num_instances: int = 3, show_ct: bool = True) -> None:
         ]
         ct_scroll_offset = 0
 
+    # Panel bounds as (left, top, right, bottom) rows for vectorized wheel hit-tests
+    rect_arr = np.array([[r.x, r.y, r.x + r.w, r.y + r.h] for r in rects], dtype=np.int32)
+
+    # Panel views are created once; render_ui repaints each panel's own background,
+    # so the gutter between panels only needs filling a single time.
+    panel_surfs = [screen.subsurface(r) for r in rects]
+    ct_surf = screen.subsurface(ct_rect) if ct_rect is not None else None
+    screen.fill((10, 10, 10))
+
     running = True
     while running:
         events = pygame.event.get()
@@ -91,9 +172,12 @@ def run_multi(num_instances: int = 3, show_ct: bool = True) -> None:
                 running = False
             if event.type == getattr(pygame, "MOUSEWHEEL", None):
                 mx, my = pygame.mouse.get_pos()
-                for i, rect in enumerate(rects):
-                    if rect.collidepoint(mx, my):
-                        scroll_offsets[i] = max(0, scroll_offsets[i] + event.y)
+                hit = np.where(
+                    (rect_arr[:, 0] <= mx) & (mx < rect_arr[:, 2])
+                    & (rect_arr[:, 1] <= my) & (my < rect_arr[:, 3])
+                )[0]
+                for i in hit:
+                    scroll_offsets[i] = max(0, scroll_offsets[i] + event.y)
                 if show_ct and ct_rect is not None and ct_rect.collidepoint(mx, my):
                     ct_scroll_offset = max(0, ct_scroll_offset + event.y)
             # route input to the panel box that is active
@@ -120,56 +204,7 @@ def run_multi(num_instances: int = 3, show_ct: bool = True) -> None:
                         else:
                             rag_tries[i] -= 1
                             q = action.split(":", 1)[1].strip()
-                            try:
-                                # Get comprehensive game context
-                                game_status = state.get_game_status()
-                                game_facts = RagTerroristHelper.build_facts(state)
-                                context = f"Game Status: {game_status}\nDetailed Context: {' '.join(game_facts)}\n\nQuestion: {q}\n\nGive a SHORT tactical response (1-2 sentences max)."
-                                
-                                # Create a message for the bot
-                                user_message = {"content": context, "role": "user"}
-                                
-                                # Send to AG2 agent (terrorist bot)
-                                bot_agent = None
-                                for agent in manager.groupchat.agents:
-                                    if hasattr(agent, 'system_message') and 'bot' in agent.name.lower():
-                                        bot_agent = agent
-                                        break
-                                
-                                if not bot_agent:
-                                    raise Exception("Could not find bot agent in group chat")
-                                
-                                agent_response = bot_agent.generate_reply(
-                                    messages=[user_message],
-                                    sender=None
-                                )
-                                
-                                # Clean up the response formatting
-                                if agent_response:
-                                    if isinstance(agent_response, dict) and 'content' in agent_response:
-                                        response_text = agent_response['content']
-                                    else:
-                                        response_text = str(agent_response)
-                                    
-                                    # Clean up excessive newlines and whitespace
-                                    response_text = response_text.replace('\\n\\n', ' ').replace('\\n', ' ')
-                                    response_text = ' '.join(response_text.split())  # Remove extra whitespace
-                                    
-                                    # Limit length to keep it readable
-                                    if len(response_text) > 200:
-                                        response_text = response_text[:197] + "..."
-                                else:
-                                    response_text = "No response from agent"
-                                
-                                chat_logs[i].append(f"AG2: {response_text} ({rag_tries[i]} tries left)")
-                            except Exception as e:
-                                error_msg = str(e)
-                                if "Could not find bot agent" in error_msg:
-                                    chat_logs[i].append(f"AG2 Error: Bot agent not found. Check AG2 setup. ({rag_tries[i]} tries left)")
-                                elif "api" in error_msg.lower() or "key" in error_msg.lower():
-                                    chat_logs[i].append(f"AG2 Error: API issue - {error_msg[:100]}... ({rag_tries[i]} tries left)")
-                                else:
-                                    chat_logs[i].append(f"AG2 Error: {error_msg[:100]}... ({rag_tries[i]} tries left)")
+                            chat_logs[i].append(_query_bot("AG2", q, include_kb=False, tries=rag_tries[i]))
                     # Vector RAG: knowledge base management and ask
                     elif action.startswith("kb:add"):
                         parts = text.strip().split(" ", 1)
@@ -197,63 +232,7 @@ def run_multi(num_instances: int = 3, show_ct: bool = True) -> None:
                         else:
                             rag_tries[i] -= 1
                             q = action.split(":", 1)[1].strip()
-                            try:
-                                # Get comprehensive game context and knowledge base info
-                                game_status = state.get_game_status()
-                                game_facts = RagTerroristHelper.build_facts(state)
-                                kb_info = kb.ask(q) or "No relevant knowledge found"
-                                
-                                context = f"""Game Status: {game_status}
-Detailed Context: {' '.join(game_facts)}
-Knowledge Base: {kb_info}
-Question: {q}
-
-Give SHORT tactical advice (1-2 sentences max) based on the current game state and available knowledge."""
-                                
-                                # Create a message for the bot
-                                user_message = {"content": context, "role": "user"}
-                                
-                                # Send to AG2 agent (terrorist bot)
-                                bot_agent = None
-                                for agent in manager.groupchat.agents:
-                                    if hasattr(agent, 'system_message') and 'bot' in agent.name.lower():
-                                        bot_agent = agent
-                                        break
-                                
-                                if not bot_agent:
-                                    raise Exception("Could not find bot agent in group chat")
-                                
-                                agent_response = bot_agent.generate_reply(
-                                    messages=[user_message],
-                                    sender=None
-                                )
-                                
-                                # Clean up the response formatting
-                                if agent_response:
-                                    if isinstance(agent_response, dict) and 'content' in agent_response:
-                                        response_text = agent_response['content']
-                                    else:
-                                        response_text = str(agent_response)
-                                    
-                                    # Clean up excessive newlines and whitespace
-                                    response_text = response_text.replace('\\n\\n', ' ').replace('\\n', ' ')
-                                    response_text = ' '.join(response_text.split())  # Remove extra whitespace
-                                    
-                                    # Limit length to keep it readable
-                                    if len(response_text) > 200:
-                                        response_text = response_text[:197] + "..."
-                                else:
-                                    response_text = "No response from agent"
-                                
-                                chat_logs[i].append(f"SMART: {response_text} ({rag_tries[i]} tries left)")
-                            except Exception as e:
-                                error_msg = str(e)
-                                if "Could not find bot agent" in error_msg:
-                                    chat_logs[i].append(f"SMART Error: Bot agent not found. Check AG2 setup. ({rag_tries[i]} tries left)")
-                                elif "api" in error_msg.lower() or "key" in error_msg.lower():
-                                    chat_logs[i].append(f"SMART Error: API issue - {error_msg[:100]}... ({rag_tries[i]} tries left)")
-                                else:
-                                    chat_logs[i].append(f"SMART Error: {error_msg[:100]}... ({rag_tries[i]} tries left)")
+                            chat_logs[i].append(_query_bot("SMART", q, include_kb=True, tries=rag_tries[i]))
                     # New: Critic evaluation of a plan using AG2 contrib CriticAgent
                     elif action.startswith("critic:"):
                         if rag_tries[i] <= 0:
@@ -306,12 +285,12 @@ Give SHORT tactical advice (1-2 sentences max) based on the current game state a
                                 for p in range(len(chat_logs)):
                                     chat_logs[p].append("Captain: Trim the sails! New round be upon us.")
                                     next_round_votes[p] = 0
-                                state.reset_round()
+                                reset_round()
                         else:
                             chat_logs[i].append("CHEAT: unknown command")
                     else:
                         # Apply action in shared game state (single terrorist entity key 'player')
-                        result = state.apply_action("Terrorists", "player", action)
+                        result = apply_action("Terrorists", "player", action)
                         
                         # Check if action was invalid
                         if result.startswith("Invalid action:"):
@@ -327,12 +306,12 @@ Give SHORT tactical advice (1-2 sentences max) based on the current game state a
                                     chat_logs[j].append(f"T{i+1}: {action}")
                         
                         # Add game status after significant actions
-                        if any(keyword in action.lower() for keyword in ["shoot", "plant", "defuse", "move"]):
-                            status = state.get_game_status()
+                        if any(k in action for k in STATUS_TRIGGERS):
+                            status = get_status()
                             chat_logs[i].append(f"📊 {status}")
                         
                         # Check if round is over
-                        if state.is_round_over():
+                        if is_round_over():
                             winner_msg = f"🏆 Round {state.round} won by {state.winner}!"
                             for j in range(num_instances):
                                 chat_logs[j].append(winner_msg)
@@ -340,7 +319,7 @@ Give SHORT tactical advice (1-2 sentences max) based on the current game state a
                                 ct_chat.append(winner_msg)
                                 
                             # Check if game is over
-                            if state.is_game_over():
+                            if is_game_over():
                                 final_winner = max(state.round_scores.items(), key=lambda x: x[1])[0]
                                 game_over_msg = f"🎯 GAME OVER! {final_winner} wins the match!"
                                 for j in range(num_instances):
@@ -349,7 +328,7 @@ Give SHORT tactical advice (1-2 sentences max) based on the current game state a
                                     ct_chat.append(game_over_msg)
                             else:
                                 # Start new round
-                                state.reset_round()
+                                reset_round()
                                 new_round_msg = f"🔄 Round {state.round} starting..."
                                 for j in range(num_instances):
                                     chat_logs[j].append(new_round_msg)
@@ -357,7 +336,7 @@ Give SHORT tactical advice (1-2 sentences max) based on the current game state a
                                     ct_chat.append(new_round_msg)
                         
                         # Smart CT response based on game state
-                        if ct_chat is not None and not state.is_round_over():
+                        if ct_chat is not None and not is_round_over():
                             # CT responds intelligently based on situation
                             if state.bomb_planted:
                                 ct_action = "defuse bomb"
@@ -366,7 +345,7 @@ Give SHORT tactical advice (1-2 sentences max) based on the current game state a
                             else:
                                 ct_action = random.choice(["shoot player", "move to A-site", "move to B-site"])
                             
-                            ct_res = state.apply_action("Counter-Terrorists", "player", ct_action)
+                            ct_res = apply_action("Counter-Terrorists", "player", ct_action)
                             ct_chat.append(f"CT: {ct_action}")
                             ct_chat.append(ct_res)
                         
@@ -401,27 +380,24 @@ Give SHORT tactical advice (1-2 sentences max) based on the current game state a
                         else:
                             ct_chat.append("CHEAT: unknown command")
                     else:
-                        res_ct = state.apply_action("Counter-Terrorists", "player", act_ct)
+                        res_ct = apply_action("Counter-Terrorists", "player", act_ct)
                         ct_chat.append(res_ct)
                         
                         # Add game status for CT after actions
-                        if any(keyword in act_ct.lower() for keyword in ["shoot", "plant", "defuse", "move"]):
-                            status = state.get_game_status()
+                        if any(k in act_ct for k in STATUS_TRIGGERS):
+                            status = get_status()
                             ct_chat.append(f"📊 {status}")
                         
                         # Limit CT chat log to last 12 messages
                         if len(ct_chat) > 12:
                             ct_chat = ct_chat[-12:]
         # Draw panels
-        screen.fill((10, 10, 10))
         for i, rect in enumerate(rects):
-            sub = screen.subsurface(rect)
             input_boxes[i].update()
-            render_ui(sub, chat_logs[i], input_boxes[i], rect.width, rect.height, scroll_offsets[i])
-        if show_ct and ct_rect is not None and ct_input is not None and ct_chat is not None:
-            sub_ct = screen.subsurface(ct_rect)
+            render_ui(panel_surfs[i], chat_logs[i], input_boxes[i], rect.width, rect.height, scroll_offsets[i])
+        if show_ct and ct_rect is not None and ct_surf is not None and ct_input is not None and ct_chat is not None:
             ct_input.update()
-            render_ui(sub_ct, ct_chat, ct_input, ct_rect.width, ct_rect.height, ct_scroll_offset if 'ct_scroll_offset' in locals() else 0)
+            render_ui(ct_surf, ct_chat, ct_input, ct_rect.width, ct_rect.height, ct_scroll_offset if 'ct_scroll_offset' in locals() else 0)
 
         pygame.display.flip()
         clock.tick(30)
@@ -1,6 +1,12 @@
 import os
+import re
 import json
-from typing import Dict, Any, Optional
+import asyncio
+import hashlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Deque, Dict, Any, List, Optional, Sequence, Set, Tuple
 from datetime import datetime
 
 from fastapi import FastAPI, HTTPException
@@ -53,13 +59,114 @@ app = FastAPI(title="Counter-Strike AG2 Agent Service", version="1.0.0")
 agents_cache = {}
 kb = ChromaRAG()
 
+# Reply cache: an exact-match dict over whole prompts, in front of a cosine ANN lookup over
+# past questions asked against the exact same game state (everything in the prompt but the question)
+PROMPT_CACHE_MAX_DISTANCE = float(os.getenv("PROMPT_CACHE_MAX_DISTANCE", "0.1"))
+PROMPT_CACHE_EXACT_MAX = 1024
+PROMPT_CACHE_MAX_ENTRIES = int(os.getenv("PROMPT_CACHE_MAX_ENTRIES", "4096"))
+_exact_reply_cache: Dict[bytes, str] = {}
+_prompt_cache_ids: Deque[str] = deque()
+prompt_cache = None
+
+
+def _reset_prompt_cache() -> None:
+    """Drop every cached reply, including the collection persisted by earlier runs."""
+    global prompt_cache
+    try:
+        kb.client.delete_collection("prompt_cache")
+    except Exception:
+        pass  # Nothing persisted yet
+    prompt_cache = kb.client.create_collection(
+        "prompt_cache", embedding_function=kb.ef, metadata={"hnsw:space": "cosine"}
+    )
+    _exact_reply_cache.clear()
+    _prompt_cache_ids.clear()
+
+
+_reset_prompt_cache()
+
+# Blocking LLM and vector-store calls run on this pool so the event loop keeps serving requests;
+# the semaphore caps how many LLM generations are in flight at once.
+_BLOCKING_POOL = ThreadPoolExecutor(max_workers=int(os.getenv("AGENT_WORKERS", "16")), thread_name_prefix="agent")
+_LLM_SLOTS = asyncio.Semaphore(int(os.getenv("AGENT_MAX_CONCURRENT_LLM", "8")))
+
+
+async def _in_pool(fn, *args):
+    """Run a blocking callable on the shared worker pool."""
+    return await asyncio.get_running_loop().run_in_executor(_BLOCKING_POOL, fn, *args)
+
+# Micro-batching: bot requests arriving within BATCH_WINDOW_S are drained together (up to
+# MAX_BATCH) so identical prompts share a single LLM call. AG2's generate_reply takes one
+# conversation at a time, so distinct prompts in a batch are still dispatched concurrently.
+BATCH_WINDOW_S = 0.015
+MAX_BATCH = 8
+# Upper bound on how long a request waits for its batched reply
+BOT_REPLY_TIMEOUT_S = float(os.getenv("AGENT_BOT_REPLY_TIMEOUT", "60"))
+_batch_queue: Optional[asyncio.Queue] = None
+_batch_tasks: Set[asyncio.Task] = set()
+
+
+async def _resolve_batch_group(bot_agent, args: tuple, futures: List[asyncio.Future]):
+    """Generate one reply and fan it out to every waiter that sent the same prompt."""
+    try:
+        async with _LLM_SLOTS:
+            result = await _in_pool(cached_generate, bot_agent, *args)
+    except Exception as e:
+        for fut in futures:
+            if not fut.done():
+                fut.set_exception(e)
+        return
+    for fut in futures:
+        if not fut.done():
+            fut.set_result(result)
+
+
+async def _batch_worker():
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await _batch_queue.get()]
+        try:
+            deadline = loop.time() + BATCH_WINDOW_S
+            while len(batch) < MAX_BATCH:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(_batch_queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            groups: Dict[Tuple[int, str, str], list] = {}
+            for bot_agent, args, fut in batch:
+                entry = groups.setdefault((id(bot_agent),) + args[:2], [bot_agent, args, []])
+                entry[2].append(fut)
+            for bot_agent, args, futures in groups.values():
+                task = asyncio.create_task(_resolve_batch_group(bot_agent, args, futures))
+                _batch_tasks.add(task)
+                task.add_done_callback(_batch_tasks.discard)
+        except Exception as e:
+            # Keep the worker alive; fail this batch's waiters instead of leaving them hanging
+            for *_, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+
 
 @app.on_event("startup")
 async def startup_event():
+    global _batch_queue
+    _batch_queue = asyncio.Queue()
+    worker = asyncio.create_task(_batch_worker())
+    _batch_tasks.add(worker)
+
     try:
         # Initialize terrorist group
         manager, agents = create_terrorists_group(num_players=3)
-        agents_cache["terrorists"] = {"manager": manager, "agents": agents}
+        # Resolve the terrorist bot once so query handlers skip the group chat scan
+        bot_agent = next(
+            (a for a in manager.groupchat.agents if hasattr(a, 'system_message') and 'bot' in a.name.lower()),
+            None,
+        )
+        agents_cache["terrorists"] = {"manager": manager, "agents": agents, "bot_agent": bot_agent}
         
         # Initialize counter-terrorist group
         ct_manager = create_team("Counter-Terrorists", is_terrorists=False)
@@ -119,151 +226,223 @@ async def process_agent_request(request: AgentRequest):
         )
 
 
-async def process_ag2_query(query: str, context: Dict[str, Any]) -> str:
+def cached_generate(
+    bot_agent, prompt: str, agent_type: str, question: str, state: str,
+    embedding: Optional[Sequence[float]] = None,
+) -> Optional[str]:
+    """Return the bot's reply text for prompt, reusing replies to identical or near-identical questions.
+
+    state is the prompt with the question left out. Lookup order: exact blake2b digest of
+    (agent_type, system_message, prompt), then the nearest stored question asked against the
+    same (agent_type, system_message, state) within PROMPT_CACHE_MAX_DISTANCE. Misses call the LLM.
+    embedding is question's kb.embed() vector when the caller already has it.
+    """
+    system_message = getattr(bot_agent, "system_message", "")
+    key = hashlib.blake2b(f"{agent_type}\0{system_message}\0{prompt}".encode()).digest()
+    cached = _exact_reply_cache.get(key)
+    if cached is not None:
+        return cached
+
+    state_key = hashlib.blake2b(f"{agent_type}\0{system_message}\0{state}".encode()).hexdigest()
+    embeddings = None
+    try:
+        embeddings = [embedding] if embedding is not None else kb.ef([question])
+        res = prompt_cache.query(query_embeddings=embeddings, n_results=1, where={"state_key": state_key})
+        distances = res.get("distances", [[]])[0] if res.get("distances") else []
+        metadatas = res.get("metadatas", [[]])[0] if res.get("metadatas") else []
+        if distances and metadatas and distances[0] < PROMPT_CACHE_MAX_DISTANCE:
+            return metadatas[0]["response"]
+    except Exception:
+        pass  # Empty collection or embedding failure: fall through to the LLM
+
+    agent_response = bot_agent.generate_reply(
+        messages=[{"content": prompt, "role": "user"}],
+        sender=None
+    )
+    if not agent_response:
+        return None
+    if isinstance(agent_response, dict) and 'content' in agent_response:
+        response_text = agent_response['content']
+    else:
+        response_text = str(agent_response)
+
+    if len(_exact_reply_cache) >= PROMPT_CACHE_EXACT_MAX:
+        _exact_reply_cache.pop(next(iter(_exact_reply_cache)), None)  # Evict oldest entry
+    _exact_reply_cache[key] = response_text
+    if embeddings is None:
+        return response_text
+    try:
+        if len(_prompt_cache_ids) >= PROMPT_CACHE_MAX_ENTRIES:
+            prompt_cache.delete(ids=[_prompt_cache_ids.popleft()])  # Evict oldest entry
+        prompt_cache.add(
+            ids=[key.hex()],
+            embeddings=embeddings,
+            documents=[question],
+            metadatas=[{"state_key": state_key, "response": response_text}],
+        )
+        _prompt_cache_ids.append(key.hex())
+    except Exception:
+        pass
+    return response_text
+
+
+# Runs of whitespace and literal "\n" escapes, collapsed in a single scan
+_WS_RE = re.compile(r"(?:\\n|\s)+")
+
+# Fixed prompt shapes for the bot-backed handlers
+_AG2_TEMPLATE = (
+    "Game Status: {gs}\nDetailed Context: {facts}\n\nQuestion: {q}\n\n"
+    "Give a SHORT tactical response (1-2 sentences max)."
+)
+_SMART_TEMPLATE = (
+    "Game Status: {gs}\nDetailed Context: {facts}\nKnowledge Base: {kb}\nQuestion: {q}\n\n"
+    "Give SHORT tactical advice (1-2 sentences max) based on the current game state and available knowledge."
+)
+
+
+def _clean(text: str) -> str:
+    """Collapse escaped "\\n" sequences and runs of whitespace, capping the reply at 200 chars."""
+    text = _WS_RE.sub(" ", text).strip()
+    return text[:197] + "..." if len(text) > 200 else text
+
+
+async def _run_bot(
+    template: str, fields: Dict[str, str], agent_type: str, embedding: Optional[Sequence[float]] = None
+) -> str:
+    """Fill template with fields, send it to the terrorist bot and return its cleaned, length-limited reply.
+
+    embedding, when given, is the question's kb.embed() vector, reused by the reply cache.
+    """
     if "terrorists" not in agents_cache:
         raise Exception("Terrorist agents not initialized")
-    
-    manager = agents_cache["terrorists"]["manager"]
-    
-    # Get comprehensive game context
-    game_status = context.get("game_status", "")
-    game_state = reconstruct_game_state(context)
-    game_facts = RagTerroristHelper.build_facts(game_state)
-    
-    full_context = f"Game Status: {game_status}\nDetailed Context: {' '.join(game_facts)}\n\nQuestion: {query}\n\nGive a SHORT tactical response (1-2 sentences max)."
-    
-    # Create a message for the bot
-    user_message = {"content": full_context, "role": "user"}
-    
-    # Send to AG2 agent (terrorist bot)
-    bot_agent = None
-    for agent in manager.groupchat.agents:
-        if hasattr(agent, 'system_message') and 'bot' in agent.name.lower():
-            bot_agent = agent
-            break
-    
+
+    bot_agent = agents_cache["terrorists"]["bot_agent"]
     if not bot_agent:
         raise Exception("Could not find bot agent in group chat")
-    
-    agent_response = bot_agent.generate_reply(
-        messages=[user_message],
-        sender=None
+
+    # The prompt minus its question identifies the game state a cached reply was given for
+    args = (
+        template.format_map(fields), agent_type, fields["q"], template.format_map({**fields, "q": ""}), embedding
     )
-    
-    # Clean up the response formatting
-    if agent_response:
-        if isinstance(agent_response, dict) and 'content' in agent_response:
-            response_text = agent_response['content']
-        else:
-            response_text = str(agent_response)
-        
-        # Clean up excessive newlines and whitespace
-        response_text = response_text.replace('\\n\\n', ' ').replace('\\n', ' ')
-        response_text = ' '.join(response_text.split())  # Remove extra whitespace
-        
-        # Limit length to keep it readable
-        if len(response_text) > 200:
-            response_text = response_text[:197] + "..."
+    if _batch_queue is None:
+        # Batch worker not running (e.g. module used outside the app): call directly
+        async with _LLM_SLOTS:
+            response_text = await _in_pool(cached_generate, bot_agent, *args)
     else:
-        response_text = "No response from agent"
+        fut = asyncio.get_running_loop().create_future()
+        await _batch_queue.put((bot_agent, args, fut))
+        response_text = await asyncio.wait_for(fut, BOT_REPLY_TIMEOUT_S)
+    return _clean(response_text) if response_text else "No response from agent"
+
+
+async def process_ag2_query(query: str, context: Dict[str, Any]) -> str:
+    # Get comprehensive game context
+    game_status = context.get("game_status", "")
+    game_facts = _facts_cached(_facts_key(context))
     
-    return response_text
+    fields = {"gs": game_status, "facts": game_facts, "q": query}
+    
+    return await _run_bot(_AG2_TEMPLATE, fields, "ag2")
 
 
 async def process_rag_query(query: str, context: Dict[str, Any]) -> str:
-    game_state = reconstruct_game_state(context)
+    game_state = GameState.from_dict(context)
     answer = RagTerroristHelper.answer(query, game_state)
     return answer
 
 
 async def process_smart_query(query: str, context: Dict[str, Any]) -> str:
-    if "terrorists" not in agents_cache:
-        raise Exception("Terrorist agents not initialized")
-    
-    manager = agents_cache["terrorists"]["manager"]
-    game_state = reconstruct_game_state(context)
-    
     # Get comprehensive game context and knowledge base info
     game_status = context.get("game_status", "")
-    game_facts = RagTerroristHelper.build_facts(game_state)
-    kb_info = kb.ask(query) or "No relevant knowledge found"
-    
-    full_context = f"""Game Status: {game_status}
-Detailed Context: {' '.join(game_facts)}
-Knowledge Base: {kb_info}
-Question: {query}
-
-Give SHORT tactical advice (1-2 sentences max) based on the current game state and available knowledge."""
-    
-    # Create a message for the bot
-    user_message = {"content": full_context, "role": "user"}
-    
-    # Send to AG2 agent (terrorist bot)
-    bot_agent = None
-    for agent in manager.groupchat.agents:
-        if hasattr(agent, 'system_message') and 'bot' in agent.name.lower():
-            bot_agent = agent
-            break
-    
-    if not bot_agent:
-        raise Exception("Could not find bot agent in group chat")
-    
-    agent_response = bot_agent.generate_reply(
-        messages=[user_message],
-        sender=None
-    )
+    game_facts = _facts_cached(_facts_key(context))
+    # Embed the query once: the same vector serves the KB lookup and the reply cache
+    try:
+        embedding = await _in_pool(kb.embed, query)
+    except Exception:
+        embedding = None
+    kb_info = None
+    if embedding is not None:
+        kb_info = await _in_pool(kb.ask_with_embedding, embedding, 0.7, query)
+    kb_info = kb_info or "No relevant knowledge found"
     
-    # Clean up the response formatting
-    if agent_response:
-        if isinstance(agent_response, dict) and 'content' in agent_response:
-            response_text = agent_response['content']
-        else:
-            response_text = str(agent_response)
-        
-        # Clean up excessive newlines and whitespace
-        response_text = response_text.replace('\\n\\n', ' ').replace('\\n', ' ')
-        response_text = ' '.join(response_text.split())  # Remove extra whitespace
-        
-        # Limit length to keep it readable
-        if len(response_text) > 200:
-            response_text = response_text[:197] + "..."
-    else:
-        response_text = "No response from agent"
+    fields = {"gs": game_status, "facts": game_facts, "kb": kb_info, "q": query}
     
-    return response_text
+    return await _run_bot(_SMART_TEMPLATE, fields, "smart", embedding)
 
 
 async def process_critic_query(query: str, context: Dict[str, Any]) -> str:
-    game_state = reconstruct_game_state(context)
-    return run_critic(query, game_state)
+    game_state = GameState.from_dict(context)
+    async with _LLM_SLOTS:
+        return await _in_pool(run_critic, query, game_state)
 
 
 async def process_quantifier_query(query: str, context: Dict[str, Any]) -> str:
-    game_state = reconstruct_game_state(context)
+    game_state = GameState.from_dict(context)
     options = [o.strip() for o in query.split("|") if o.strip()]
-    return run_quantifier(options, game_state)
+    async with _LLM_SLOTS:
+        return await _in_pool(run_quantifier, options, game_state)
 
 
 async def process_som_query(query: str, context: Dict[str, Any]) -> str:
-    game_state = reconstruct_game_state(context)
-    return run_som(query, game_state)
-
-
-def reconstruct_game_state(context: Dict[str, Any]) -> GameState:
-    game_state = GameState()
-    game_state.round = context.get("round", 1)
-    game_state.player_health = context.get("player_health", {
-        team: {"player": 100, "bot": 100} for team in ["Terrorists", "Counter-Terrorists"]
-    })
-    game_state.bomb_planted = context.get("bomb_planted", False)
-    game_state.bomb_site = context.get("bomb_site")
-    game_state.winner = context.get("winner")
-    game_state.phase = context.get("phase", "chat")
-    game_state.round_scores = context.get("round_scores", {"Terrorists": 0, "Counter-Terrorists": 0})
-    game_state.current_positions = context.get("current_positions", {
-        team: {"player": "spawn", "bot": "spawn"} for team in ["Terrorists", "Counter-Terrorists"]
-    })
-    return game_state
+    game_state = GameState.from_dict(context)
+    async with _LLM_SLOTS:
+        return await _in_pool(run_som, query, game_state)
+
+
+# Context fields RagTerroristHelper.build_facts reads once rebuilt into a GameState
+_FACT_FIELDS = ("round", "bomb_planted", "bomb_site", "round_scores", "player_health")
+
+
+def _freeze(value: Any) -> Any:
+    """Turn (nested) dicts into hashable tuples of items; scalars pass through."""
+    if isinstance(value, dict):
+        return tuple((k, _freeze(v)) for k, v in value.items())
+    return value
+
+
+def _thaw(value: Any) -> Any:
+    """Inverse of _freeze for the dict-or-scalar values found in game contexts."""
+    if isinstance(value, tuple):
+        return {k: _thaw(v) for k, v in value}
+    return value
+
+
+def _facts_key(context: Dict[str, Any]) -> tuple:
+    """Hashable signature of the context fields that determine build_facts output."""
+    return tuple((f, _freeze(context[f])) for f in _FACT_FIELDS if f in context)
+
+
+@lru_cache(maxsize=256)
+def _facts_cached(key: tuple) -> str:
+    """Space-joined build_facts output for a _facts_key signature."""
+    game_state = GameState.from_dict({f: _thaw(v) for f, v in key})
+    return " ".join(RagTerroristHelper.build_facts(game_state))
+
+
+# Bumped after every knowledge-base mutation, so answers cached under an older generation stop matching
+_kb_generation = 0
+
+
+@lru_cache(maxsize=256)
+def _kb_ask_cached(query: str, generation: int) -> Optional[str]:
+    """kb.ask memoized per (query, KB generation)."""
+    return kb.ask(query)
+
+
+def _reload_kb(file_path: str) -> int:
+    """Clear then load, so a reload reflects updates to the file."""
+    kb.clear()
+    return kb.add_file(file_path)
+
+
+async def _mutate_kb(fn, *args):
+    """Run a blocking KB mutation on the pool, then retire cached answers and bot replies."""
+    global _kb_generation
+    try:
+        return await _in_pool(fn, *args)
+    finally:
+        _kb_generation += 1
+        await _in_pool(_reset_prompt_cache)
 
 
 @app.get("/agents/status")
@@ -277,7 +456,7 @@ async def get_agents_status():
 @app.post("/kb/add", response_model=KBResponse)
 async def add_to_kb(request: KBAddRequest):
     try:
-        count = kb.add_texts([request.text])
+        count = await _mutate_kb(kb.add_texts, [request.text])
         return KBResponse(success=True, count=count)
     except Exception as e:
         return KBResponse(success=False, error=str(e))
@@ -286,8 +465,7 @@ async def add_to_kb(request: KBAddRequest):
 @app.post("/kb/load", response_model=KBResponse)
 async def load_file_to_kb(request: KBLoadRequest):
     try:
-        kb.clear()  # Clear then load to ensure reload reflects updates
-        count = kb.add_file(request.file_path)
+        count = await _mutate_kb(_reload_kb, request.file_path)
         return KBResponse(success=True, count=count)
     except Exception as e:
         return KBResponse(success=False, error=str(e))
@@ -296,7 +474,7 @@ async def load_file_to_kb(request: KBLoadRequest):
 @app.post("/kb/clear", response_model=KBResponse)
 async def clear_kb():
     try:
-        kb.clear()
+        await _mutate_kb(kb.clear)
         return KBResponse(success=True, count=0)
     except Exception as e:
         return KBResponse(success=False, error=str(e))
@@ -305,7 +483,7 @@ async def clear_kb():
 @app.post("/kb/ask", response_model=KBResponse)
 async def ask_kb(request: KBAskRequest):
     try:
-        answer = kb.ask(request.query)
+        answer = await _in_pool(_kb_ask_cached, request.query, _kb_generation)
         return KBResponse(success=True, answer=answer or "no match")
     except Exception as e:
         return KBResponse(success=False, error=str(e))
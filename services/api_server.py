@@ -1,13 +1,19 @@
 import os
 import json
+import asyncio
 import uuid
-from typing import Dict, List, Optional
+import hashlib
+import weakref
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, List, Optional, Set
 from datetime import datetime
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Depends
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Depends, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import asyncpg
+import orjson
 
 from .database import db_manager
 
@@ -52,30 +58,73 @@ app.add_middleware(
 # WebSocket connection manager
 class ConnectionManager:
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
+        self.active_connections: Set[WebSocket] = set()
 
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
-        self.active_connections.append(websocket)
+        self.active_connections.add(websocket)
 
     def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+        # discard: broadcast() may already have pruned this socket
+        self.active_connections.discard(websocket)
 
     async def send_personal_message(self, message: str, websocket: WebSocket):
         await websocket.send_text(message)
 
-    async def broadcast(self, message: str):
-        for connection in self.active_connections:
-            try:
-                await connection.send_text(message)
-            except:
-                pass
+    async def broadcast(self, message: bytes):
+        # Decode the orjson payload once; clients keep receiving text frames
+        text = message.decode()
+        connections = tuple(self.active_connections)
+        # Fan out concurrently so one slow client doesn't delay the rest
+        results = await asyncio.gather(
+            *(connection.send_text(text) for connection in connections),
+            return_exceptions=True
+        )
+        self.active_connections.difference_update(
+            c for c, r in zip(connections, results) if isinstance(r, Exception)
+        )
 
 
 manager = ConnectionManager()
 
+# Sessions kept in memory; evicted ones are reloaded from their latest game_states row
+GAME_STATES_CACHE_MAX = int(os.getenv("GAME_STATES_CACHE_MAX", "1024"))
+
+
+class GameStateCache(OrderedDict):
+    """LRU-bounded session_id -> GameState map.
+
+    Every action already persists a state snapshot, so eviction needs no write-back.
+    """
+
+    def __init__(self, maxsize: int):
+        super().__init__()
+        self.maxsize = maxsize
+
+    def __getitem__(self, session_id: str) -> GameState:
+        game_state = super().__getitem__(session_id)
+        self.move_to_end(session_id)
+        return game_state
+
+    def __setitem__(self, session_id: str, game_state: GameState):
+        super().__setitem__(session_id, game_state)
+        self.move_to_end(session_id)
+        if len(self) > self.maxsize:
+            self.popitem(last=False)
+
+
 # In-memory game states cache
-game_states_cache: Dict[str, GameState] = {}
+game_states_cache: Dict[str, GameState] = GameStateCache(GAME_STATES_CACHE_MAX)
+# Serializes mutations per session; different sessions proceed in parallel.
+# Weak values: a lock disappears once no request holds or waits on it.
+_session_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+
+def _session_lock(session_id: str) -> asyncio.Lock:
+    lock = _session_locks.get(session_id)
+    if lock is None:
+        lock = _session_locks[session_id] = asyncio.Lock()
+    return lock
 
 
 async def get_db_connection():
@@ -102,11 +151,7 @@ async def health_check():
 async def create_session(session_data: GameSessionCreate, conn: asyncpg.Connection = Depends(get_db_connection)):
     session_id = str(uuid.uuid4())
     
-    await conn.execute(
-        """
-        INSERT INTO game_sessions (id, session_name, max_rounds)
-        VALUES ($1, $2, $3)
-        """,
+    await conn.stmts["insert_session"].fetch(
         session_id, session_data.session_name, session_data.max_rounds
     )
     
@@ -118,9 +163,7 @@ async def create_session(session_data: GameSessionCreate, conn: asyncpg.Connecti
     # Save initial game state
     await save_game_state(conn, session_id, game_state)
     
-    session = await conn.fetchrow(
-        "SELECT * FROM game_sessions WHERE id = $1", session_id
-    )
+    session = await conn.stmts["select_session"].fetchrow(session_id)
     
     return GameSessionResponse(
         id=str(session['id']),
@@ -151,8 +194,39 @@ async def list_sessions(conn: asyncpg.Connection = Depends(get_db_connection)):
     ]
 
 
-@app.get("/sessions/{session_id}/state")
-async def get_game_state(session_id: str, conn: asyncpg.Connection = Depends(get_db_connection)):
+def _state_payload(game_state: GameState, session_id: str) -> dict:
+    """Response body for a session's current state (shared by the state and action endpoints)."""
+    return {
+        "session_id": session_id,
+        "round": game_state.round,
+        "max_rounds": game_state.max_rounds,
+        "player_health": game_state.player_health,
+        "bomb_planted": game_state.bomb_planted,
+        "bomb_site": game_state.bomb_site,
+        "winner": game_state.winner,
+        "phase": game_state.phase,
+        "round_scores": game_state.round_scores,
+        "current_positions": game_state.current_positions,
+        "game_status": game_state.get_game_status(),
+        "is_round_over": game_state.is_round_over(),
+        "is_game_over": game_state.is_game_over()
+    }
+
+
+async def _load_game_state(session_id: str, conn: asyncpg.Connection) -> GameState:
+    """Cached GameState for a session, reloading the latest snapshot on a miss.
+
+    The reload waits for the session lock, so it never reads a snapshot older than an
+    action that is still being applied and written.
+    """
+    if session_id in game_states_cache:
+        return game_states_cache[session_id]
+    async with _session_lock(session_id):
+        return await _load_game_state_locked(session_id, conn)
+
+
+async def _load_game_state_locked(session_id: str, conn: asyncpg.Connection) -> GameState:
+    """_load_game_state for callers already holding _session_lock(session_id)."""
     if session_id not in game_states_cache:
         # Load from database
         state_data = await conn.fetchrow(
@@ -169,27 +243,30 @@ async def get_game_state(session_id: str, conn: asyncpg.Connection = Depends(get
             raise HTTPException(status_code=404, detail="Game session not found")
         
         # Reconstruct GameState from stored data
-        game_state = GameState()
-        # This would need proper deserialization logic
-        game_states_cache[session_id] = game_state
-    
-    game_state = game_states_cache[session_id]
+        game_states_cache[session_id] = GameState.from_dict(state_data["state_data"])
     
-    return {
-        "session_id": session_id,
-        "round": game_state.round,
-        "max_rounds": game_state.max_rounds,
-        "player_health": game_state.player_health,
-        "bomb_planted": game_state.bomb_planted,
-        "bomb_site": game_state.bomb_site,
-        "winner": game_state.winner,
-        "phase": game_state.phase,
-        "round_scores": game_state.round_scores,
-        "current_positions": game_state.current_positions,
-        "game_status": game_state.get_game_status(),
-        "is_round_over": game_state.is_round_over(),
-        "is_game_over": game_state.is_game_over()
-    }
+    return game_states_cache[session_id]
+
+
+def _state_etag(game_state: GameState) -> str:
+    """Strong ETag for a session's state, derived from the cached state JSON."""
+    return '"' + hashlib.blake2b(game_state.to_state_json().encode(), digest_size=8).hexdigest() + '"'
+
+
+@app.get("/sessions/{session_id}/state")
+async def get_game_state(
+    session_id: str,
+    request: Request,
+    response: Response,
+    conn: asyncpg.Connection = Depends(get_db_connection)
+):
+    game_state = await _load_game_state(session_id, conn)
+    game_state.is_round_over()  # may settle winner, so tag afterwards
+    etag = _state_etag(game_state)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return _state_payload(game_state, session_id)
 
 
 @app.post("/sessions/{session_id}/actions")
@@ -198,48 +275,41 @@ async def apply_action(
     action_data: GameAction, 
     conn: asyncpg.Connection = Depends(get_db_connection)
 ):
-    if session_id not in game_states_cache:
-        raise HTTPException(status_code=404, detail="Game session not found")
-    
-    game_state = game_states_cache[session_id]
-    
-    # Apply action
-    result = game_state.apply_action(action_data.team, action_data.player, action_data.action)
-    
-    # Log action to database
-    await conn.execute(
-        """
-        INSERT INTO game_actions (session_id, round_number, team, player_name, action, result)
-        VALUES ($1, $2, $3, $4, $5, $6)
-        """,
-        session_id, game_state.round, action_data.team, action_data.player, action_data.action, result
-    )
-    
-    # Save updated game state
-    await save_game_state(conn, session_id, game_state)
-    
-    # Broadcast to WebSocket clients
-    await manager.broadcast(json.dumps({
-        "type": "action_result",
-        "session_id": session_id,
-        "team": action_data.team,
-        "player": action_data.player,
-        "action": action_data.action,
-        "result": result,
-        "game_state": {
-            "round": game_state.round,
-            "player_health": game_state.player_health,
-            "bomb_planted": game_state.bomb_planted,
-            "winner": game_state.winner,
-            "is_round_over": game_state.is_round_over(),
-            "is_game_over": game_state.is_game_over()
+    async with _session_lock(session_id):
+        game_state = await _load_game_state_locked(session_id, conn)
+        
+        # Apply action, then settle round/game flags once (is_round_over may set winner)
+        result = game_state.apply_action(action_data.team, action_data.player, action_data.action)
+        is_round_over = game_state.is_round_over()
+        is_game_over = game_state.is_game_over()
+        
+        # Log action and save updated game state in a single statement
+        await conn.stmts["insert_action_and_state"].fetch(
+            session_id, game_state.round, action_data.team, action_data.player, action_data.action, result,
+            *_state_columns(game_state)
+        )
+        
+        # Broadcast to WebSocket clients
+        state = game_state.to_state_dict()
+        await manager.broadcast(_action_prefix(session_id) + orjson.dumps({
+            "team": action_data.team,
+            "player": action_data.player,
+            "action": action_data.action,
+            "result": result,
+            "game_state": {
+                "round": state["round"],
+                "player_health": state["player_health"],
+                "bomb_planted": state["bomb_planted"],
+                "winner": state["winner"],
+                "is_round_over": is_round_over,
+                "is_game_over": is_game_over
+            }
+        })[1:])
+        
+        return {
+            "result": result,
+            "game_state": _state_payload(game_state, session_id)
         }
-    }))
-    
-    return {
-        "result": result,
-        "game_state": await get_game_state(session_id, conn)
-    }
 
 
 
@@ -267,37 +337,27 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
         manager.disconnect(websocket)
 
 
-async def save_game_state(conn: asyncpg.Connection, session_id: str, game_state: GameState):
-    state_data = {
-        "round": game_state.round,
-        "max_rounds": game_state.max_rounds,
-        "player_health": game_state.player_health,
-        "bomb_planted": game_state.bomb_planted,
-        "bomb_site": game_state.bomb_site,
-        "winner": game_state.winner,
-        "phase": game_state.phase,
-        "round_scores": game_state.round_scores,
-        "round_time": game_state.round_time,
-        "bomb_timer": game_state.bomb_timer,
-        "current_positions": game_state.current_positions,
-        "last_action_results": game_state.last_action_results
-    }
-    
-    await conn.execute(
-        """
-        INSERT INTO game_states (session_id, round_number, phase, bomb_planted, bomb_site, winner, state_data)
-        VALUES ($1, $2, $3, $4, $5, $6, $7)
-        """,
-        session_id,
-        game_state.round,
+@lru_cache(maxsize=1024)
+def _action_prefix(session_id: str) -> bytes:
+    """Serialized '{"type":"action_result","session_id":...,' head of a session's broadcasts."""
+    return orjson.dumps({"type": "action_result", "session_id": session_id})[:-1] + b","
+
+
+def _state_columns(game_state: GameState) -> tuple:
+    """(phase, bomb_planted, bomb_site, winner, state_data JSON) for a game_states row."""
+    return (
         game_state.phase,
         game_state.bomb_planted,
         game_state.bomb_site,
         game_state.winner,
-        json.dumps(state_data)
+        game_state.to_state_json()
     )
 
 
+async def save_game_state(conn: asyncpg.Connection, session_id: str, game_state: GameState):
+    await conn.stmts["insert_state"].fetch(session_id, game_state.round, *_state_columns(game_state))
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8080)
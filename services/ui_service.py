@@ -1,61 +1,146 @@
 import os
 import json
 import asyncio
-import aiohttp
-from typing import List, Dict, Any, Optional
+from collections import deque
+import httpx
+import orjson
+from typing import Deque, List, Dict, Any, Optional, Set, Tuple, Union
 from datetime import datetime
 
 import pygame
 
 from counter_strike_ag2_agent.ui import InputBox, render_ui
 
+# Lines shown per chat panel
+CHAT_LOG_MAX = 12
+
+# Static help lines seeded into every terrorist panel / the CT panel
+T_HELP_LINES = (
+    "Commands: 'shoot player/bot', 'plant bomb', 'move to A-site', 'defuse bomb'",
+    "AI Help: 'rag:', 'ag2:', 'smart:', 'critic:', 'quant:', 'som:', 'kb:add', 'kb:load <file>', 'kb:clear', 'ask:'"
+)
+CT_HELP_LINES = (
+    "Commands: 'shoot player/bot', 'defuse bomb', 'move to A-site/B-site'",
+    "Objective: Prevent bomb plant or defuse if planted!"
+)
+
+# Panel command prefix -> agent service agent_type
+AGENT_TYPE_MAP = {
+    "rag": "rag",
+    "ag2": "ag2",
+    "smart": "smart",
+    "critic": "critic",
+    "quant": "quantifier",
+    "som": "som"
+}
+AGENT_PREFIXES = frozenset(AGENT_TYPE_MAP)
+# Actions after which the panel also shows the game status line
+STATUS_KEYWORDS = ("shoot", "plant", "defuse", "move")
+# Most queued agent queries sent together per batcher pass
+MAX_AGENT_BATCH = 8
+# Frame pacing: the loop polls input, then sleeps this long so network handlers keep running
+FRAME_BUDGET_S = 1 / 30
+# Window events after which every panel is redrawn
+_MOUSEWHEEL = getattr(pygame, "MOUSEWHEEL", -1)  # -1 never matches an event type
+_EXPOSE_EVENTS = {getattr(pygame, "VIDEOEXPOSE", None), getattr(pygame, "WINDOWEXPOSED", None)} - {None}
+
+
+class PanelLog:
+    """One terrorist panel's view of the shared team chat log.
+
+    Lines live once in a shared deque as (audience, line): the panel index for a
+    panel's own lines, ``-1 - sender`` for a teammate broadcast (shown to every panel
+    but the sender) or None for messages to all panels.
+    """
+
+    __slots__ = ("_shared", "_index")
+
+    def __init__(self, shared: Deque[Tuple[Optional[int], str]], index: int):
+        self._shared = shared
+        self._index = index
+
+    def append(self, line: str) -> None:
+        self._shared.append((self._index, line))
+
+    def _lines(self) -> List[str]:
+        own, sent = self._index, -1 - self._index
+        lines = [
+            line for audience, line in self._shared
+            if audience is None or audience == own or (audience < 0 and audience != sent)
+        ]
+        return lines[-CHAT_LOG_MAX:]
+
+    def __iter__(self):
+        return iter(self._lines())
+
+    def __len__(self) -> int:
+        return len(self._lines())
+
 
 class APIClient:
     def __init__(self, api_url: str, agent_url: str):
         self.api_url = api_url
         self.agent_url = agent_url
-        self.session: Optional[aiohttp.ClientSession] = None
+        self.session: Optional[httpx.AsyncClient] = None
+        # (url, ETag, body) of the last state fetch, for If-None-Match revalidation
+        self._state_cache: Optional[Tuple[str, str, Dict[str, Any]]] = None
 
     async def initialize(self):
-        self.session = aiohttp.ClientSession()
+        # One pooled client for both hosts; HTTP/2 multiplexes concurrent calls where negotiated
+        self.session = httpx.AsyncClient(
+            http2=True,
+            timeout=30.0,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=75),
+        )
 
     async def close(self):
         if self.session:
-            await self.session.close()
+            await self.session.aclose()
+
+    async def _post_json(self, url: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        response = await self.session.post(
+            url, content=orjson.dumps(payload), headers={"Content-Type": "application/json"}
+        )
+        return orjson.loads(response.content)
 
     async def create_session(self, session_name: str, max_rounds: int = 3) -> Dict[str, Any]:
-        async with self.session.post(
+        return await self._post_json(
             f"{self.api_url}/sessions",
-            json={"session_name": session_name, "max_rounds": max_rounds}
-        ) as response:
-            return await response.json()
+            {"session_name": session_name, "max_rounds": max_rounds}
+        )
 
     async def get_game_state(self, session_id: str) -> Dict[str, Any]:
-        async with self.session.get(f"{self.api_url}/sessions/{session_id}/state") as response:
-            return await response.json()
+        url = f"{self.api_url}/sessions/{session_id}/state"
+        cached = self._state_cache if self._state_cache and self._state_cache[0] == url else None
+        headers = {"If-None-Match": cached[1]} if cached else {}
+        response = await self.session.get(url, headers=headers)
+        if response.status_code == 304 and cached:
+            return cached[2]
+        state = orjson.loads(response.content)
+        etag = response.headers.get("ETag")
+        self._state_cache = (url, etag, state) if etag else None
+        return state
 
     async def apply_action(self, session_id: str, team: str, player: str, action: str) -> Dict[str, Any]:
-        async with self.session.post(
+        return await self._post_json(
             f"{self.api_url}/sessions/{session_id}/actions",
-            json={
+            {
                 "session_id": session_id,
                 "team": team,
                 "player": player,
                 "action": action
             }
-        ) as response:
-            return await response.json()
+        )
 
     async def query_agent(self, agent_type: str, query: str, context: Dict[str, Any]) -> Dict[str, Any]:
-        async with self.session.post(
+        return await self._post_json(
             f"{self.agent_url}/process",
-            json={
+            {
                 "agent_type": agent_type,
                 "query": query,
                 "context": context
             }
-        ) as response:
-            return await response.json()
+        )
 
 
 class DockerizedUI:
@@ -73,20 +158,37 @@ class DockerizedUI:
         self.game_state: Dict[str, Any] = {}
         
         # UI state
-        self.chat_logs: List[List[str]] = []
+        self.chat_logs: List[PanelLog] = []
+        self._team_log: Deque[Tuple[Optional[int], str]] = deque(
+            maxlen=CHAT_LOG_MAX * (num_instances + 1)
+        )
         self.input_boxes: List[InputBox] = []
         self.rects: List[pygame.Rect] = []
         self.ct_rect: Optional[pygame.Rect] = None
         self.rag_tries: List[int] = []
         self.scroll_offsets: List[int] = []
+        self._dirty: bool = True  # Redraw needed on the next frame
+        # Per-panel (log, input text, scroll, input width) last drawn; CT panel is last
+        self._panel_keys: List[Optional[tuple]] = []
+        self._panel_surfs: List[pygame.Surface] = []
+        self._ct_surf: Optional[pygame.Surface] = None
+        self._full_refresh: bool = True  # Next frame presents the whole window
+        
+        # Agent queries are queued and sent in concurrent batches (see _agent_batcher)
+        self._agent_queue: Optional[asyncio.Queue[Tuple[str, str, Dict[str, Any], asyncio.Future]]] = None
+        self._agent_batcher_task: Optional[asyncio.Task] = None
+        self._background: Set[asyncio.Task] = set()
+        self._state_lock = asyncio.Lock()
         
         # CT panel state
         self.ct_input: Optional[InputBox] = None
-        self.ct_chat: Optional[List[str]] = None
+        self.ct_chat: Optional[Deque[str]] = None
         self.ct_scroll_offset: int = 0
 
     async def initialize(self):
         await self.api_client.initialize()
+        self._agent_queue = asyncio.Queue()
+        self._agent_batcher_task = asyncio.create_task(self._agent_batcher())
         
         # Create game session
         session_data = await self.api_client.create_session(
@@ -108,28 +210,32 @@ class DockerizedUI:
         rows = (total_panels + cols - 1) // cols
         panel_w, panel_h = 700, 360
         pad = 10
+        # Grid geometry for the closed-form hit test in _panel_at
+        self._cols = cols
+        self._pad = pad
+        self._panel_size = (panel_w, panel_h)
         width = cols * panel_w + (cols + 1) * pad
         height = rows * panel_h + (rows + 1) * pad
         
         self.screen = pygame.display.set_mode((width, height))
         pygame.display.set_caption("Counter-Strike AG2 Multi-Agent (Dockerized)")
-        self.clock = pygame.time.Clock()
         
         # Initialize panels
+        short_id = self.session_id[:8]
         for i in range(self.num_instances):
             r = i // cols
             c = i % cols
             x = pad + c * (panel_w + pad)
             y = pad + r * (panel_h + pad)
             self.rects.append(pygame.Rect(x, y, panel_w, panel_h))
-            self.chat_logs.append([
-                f"T{i+1}: Ready! Docker Session {self.session_id[:8]}",
-                "Commands: 'shoot player/bot', 'plant bomb', 'move to A-site', 'defuse bomb'",
-                "AI Help: 'rag:', 'ag2:', 'smart:', 'critic:', 'quant:', 'som:', 'kb:add', 'kb:load <file>', 'kb:clear', 'ask:'"
-            ])
+            chat_log = PanelLog(self._team_log, i)
+            chat_log.append(f"T{i+1}: Ready! Docker Session {short_id}")
+            self.chat_logs.append(chat_log)
             self.input_boxes.append(InputBox(x + 10, y + panel_h - 50, panel_w - 20, 32))
             self.rag_tries.append(5)
             self.scroll_offsets.append(0)
+        # Help lines are shared by all terrorist panels, so store them once
+        self._team_log.extend((None, line) for line in T_HELP_LINES)
         
         # CT panel
         if self.show_ct:
@@ -140,11 +246,15 @@ class DockerizedUI:
             y = pad + r * (panel_h + pad)
             self.ct_rect = pygame.Rect(x, y, panel_w, panel_h)
             self.ct_input = InputBox(x + 10, y + panel_h - 50, panel_w - 20, 32)
-            self.ct_chat = [
-                f"CT: Ready! Docker Session {self.session_id[:8]}",
-                "Commands: 'shoot player/bot', 'defuse bomb', 'move to A-site/B-site'",
-                "Objective: Prevent bomb plant or defuse if planted!"
-            ]
+            self.ct_chat = deque(
+                (f"CT: Ready! Docker Session {short_id}", *CT_HELP_LINES), maxlen=CHAT_LOG_MAX
+            )
+        
+        # Panel subsurfaces are views into the screen; create them once
+        self.screen.fill((10, 10, 10))
+        self._panel_surfs = [self.screen.subsurface(rect) for rect in self.rects]
+        self._ct_surf = self.screen.subsurface(self.ct_rect) if self.ct_rect else None
+        self._panel_keys = [None] * (self.num_instances + 1)
         
         # Get initial game state
         self.game_state = await self.api_client.get_game_state(self.session_id)
@@ -154,30 +264,44 @@ class DockerizedUI:
         
         running = True
         while running:
-            events = pygame.event.get()
-            for event in events:
+            for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     running = False
+                if event.type != pygame.MOUSEMOTION:
+                    self._dirty = True
+                if event.type in _EXPOSE_EVENTS:
+                    self._panel_keys = [None] * len(self._panel_keys)
+                    self._full_refresh = True
                 
-                if event.type == getattr(pygame, "MOUSEWHEEL", None):
-                    mx, my = pygame.mouse.get_pos()
-                    for i, rect in enumerate(self.rects):
-                        if rect.collidepoint(mx, my):
-                            self.scroll_offsets[i] = max(0, self.scroll_offsets[i] + event.y)
-                    if self.show_ct and self.ct_rect and self.ct_rect.collidepoint(mx, my):
+                if event.type == _MOUSEWHEEL:
+                    idx = self._panel_at(*pygame.mouse.get_pos())
+                    if idx is not None and idx < self.num_instances:
+                        self.scroll_offsets[idx] = max(0, self.scroll_offsets[idx] + event.y)
+                    elif idx == self.num_instances and self.show_ct and self.ct_rect:
                         self.ct_scroll_offset = max(0, self.ct_scroll_offset + event.y)
                 
                 # Handle terrorist panel inputs
                 for i, ib in enumerate(self.input_boxes):
                     text = ib.handle_event(event)
                     if text is not None:
-                        await self.handle_terrorist_input(i, text)
+                        # Handlers run in the background so the frame loop never waits on the network
+                        self._spawn(self.handle_terrorist_input(i, text))
+                        self._dirty = True
                 
                 # Handle CT panel input
                 if self.show_ct and self.ct_input:
                     text_ct = self.ct_input.handle_event(event)
                     if text_ct is not None:
-                        await self.handle_ct_input(text_ct)
+                        self._spawn(self.handle_ct_input(text_ct))
+                        self._dirty = True
+            
+            # Yield the rest of the frame to background handlers instead of blocking the event loop
+            await asyncio.sleep(FRAME_BUDGET_S)
+            
+            # Only re-layout and redraw when something changed
+            if not self._dirty:
+                continue
+            self._dirty = False
             
             # Update input boxes
             for ib in self.input_boxes:
@@ -185,52 +309,104 @@ class DockerizedUI:
             if self.ct_input:
                 self.ct_input.update()
             
-            # Render UI
-            self.screen.fill((10, 10, 10))
+            # Render UI: only panels whose content changed since they were last drawn
+            changed: List[pygame.Rect] = []
             for i, rect in enumerate(self.rects):
-                sub = self.screen.subsurface(rect)
-                render_ui(sub, self.chat_logs[i], self.input_boxes[i], rect.width, rect.height, self.scroll_offsets[i])
+                ib = self.input_boxes[i]
+                lines = tuple(self.chat_logs[i])
+                key = (lines, ib.text, self.scroll_offsets[i], ib.rect.w)
+                if key != self._panel_keys[i]:
+                    render_ui(self._panel_surfs[i], lines, ib, rect.width, rect.height, self.scroll_offsets[i])
+                    self._panel_keys[i] = key
+                    changed.append(rect)
             
             if self.show_ct and self.ct_rect and self.ct_input and self.ct_chat:
-                sub_ct = self.screen.subsurface(self.ct_rect)
-                render_ui(sub_ct, self.ct_chat, self.ct_input, self.ct_rect.width, self.ct_rect.height, self.ct_scroll_offset)
+                key = (tuple(self.ct_chat), self.ct_input.text, self.ct_scroll_offset, self.ct_input.rect.w)
+                if key != self._panel_keys[-1]:
+                    render_ui(self._ct_surf, self.ct_chat, self.ct_input, self.ct_rect.width, self.ct_rect.height, self.ct_scroll_offset)
+                    self._panel_keys[-1] = key
+                    changed.append(self.ct_rect)
             
-            pygame.display.flip()
-            self.clock.tick(30)
+            # Push only the repainted panel rects to the display
+            if self._full_refresh:
+                pygame.display.flip()
+                self._full_refresh = False
+            elif changed:
+                pygame.display.update(changed)
         
         await self.cleanup()
 
+    def _panel_at(self, mx: int, my: int) -> Optional[int]:
+        """Panel index under (mx, my) from the grid layout (CT is num_instances), or None."""
+        panel_w, panel_h = self._panel_size
+        c, rx = divmod(mx - self._pad, panel_w + self._pad)
+        r, ry = divmod(my - self._pad, panel_h + self._pad)
+        if not (0 <= c < self._cols and rx < panel_w and ry < panel_h and r >= 0):
+            return None
+        idx = r * self._cols + c
+        return idx if idx <= self.num_instances else None
+
+    @staticmethod
+    def _parse_command(text: str) -> Tuple[str, str, str]:
+        """Lowercased action (minus any "action:" prefix) and its (head, rest) around the first colon."""
+        action = text.lower().strip()
+        head, sep, rest = action.partition(":")
+        if sep and head == "action":
+            action = rest.strip()
+            head, sep, rest = action.partition(":")
+        return action, (head if sep else ""), rest
+
+    def _spawn(self, coro) -> None:
+        """Run a panel handler in the background and redraw once it finishes."""
+        async def runner():
+            try:
+                await coro
+            finally:
+                self._dirty = True
+        task = asyncio.create_task(runner())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _agent_batcher(self):
+        """Drain queued agent queries and send each batch concurrently."""
+        while True:
+            batch = [await self._agent_queue.get()]
+            while len(batch) < MAX_AGENT_BATCH and not self._agent_queue.empty():
+                batch.append(self._agent_queue.get_nowait())
+            results = await asyncio.gather(
+                *(self.api_client.query_agent(t, q, ctx) for t, q, ctx, _ in batch),
+                return_exceptions=True
+            )
+            for (_, _, _, fut), result in zip(batch, results):
+                if fut.done():
+                    continue
+                if isinstance(result, BaseException):
+                    fut.set_exception(result)
+                else:
+                    fut.set_result(result)
+
+    async def _query_agent(self, agent_type: str, query: str, context: Dict[str, Any]) -> Dict[str, Any]:
+        fut = asyncio.get_running_loop().create_future()
+        await self._agent_queue.put((agent_type, query, context, fut))
+        return await fut
+
     async def handle_terrorist_input(self, panel_index: int, text: str):
         self.chat_logs[panel_index].append(f"You: {text}")
-        action = text.lower().strip()
-        
-        if action.startswith("action:"):
-            action = action.split(":", 1)[1].strip()
+        action, head, rest = self._parse_command(text)
         
         try:
             # Handle AI queries
-            if action.startswith(("rag:", "ag2:", "smart:", "critic:", "quant:", "som:")):
+            if head in AGENT_PREFIXES:
                 if self.rag_tries[panel_index] <= 0:
                     self.chat_logs[panel_index].append("AI: No tries left.")
                     return
                 
                 self.rag_tries[panel_index] -= 1
-                agent_type = action.split(":")[0]
-                query = action.split(":", 1)[1].strip()
-                
-                # Map agent types
-                agent_type_map = {
-                    "rag": "rag",
-                    "ag2": "ag2", 
-                    "smart": "smart",
-                    "critic": "critic",
-                    "quant": "quantifier",
-                    "som": "som"
-                }
-                
-                mapped_type = agent_type_map.get(agent_type, agent_type)
+                agent_type = head
+                query = rest.strip()
+                mapped_type = AGENT_TYPE_MAP[agent_type]
                 
-                response = await self.api_client.query_agent(
+                response = await self._query_agent(
                     mapped_type, 
                     query, 
                     self.game_state
@@ -246,56 +422,50 @@ class DockerizedUI:
                     )
             
             # Handle cheat commands
-            elif action.startswith("cheat:"):
+            elif head == "cheat":
                 await self.handle_cheat_command(panel_index, action)
             
             # Handle regular game actions
             else:
-                result = await self.api_client.apply_action(
-                    self.session_id, 
-                    "Terrorists", 
-                    "player", 
-                    action
-                )
+                # Actions apply in submission order and own the game_state write
+                async with self._state_lock:
+                    result = await self.api_client.apply_action(
+                        self.session_id, 
+                        "Terrorists", 
+                        "player", 
+                        action
+                    )
                 
-                if not result["result"].startswith("Invalid action:"):
-                    self.chat_logs[panel_index].append(result["result"])
+                    if not result["result"].startswith("Invalid action:"):
+                        self.chat_logs[panel_index].append(result["result"])
                     
-                    # Broadcast to other terrorist panels
-                    for j in range(self.num_instances):
-                        if j != panel_index:
-                            self.chat_logs[j].append(f"T{panel_index+1}: {action}")
+                        # Broadcast to other terrorist panels (one shared entry)
+                        self._team_log.append((-1 - panel_index, f"T{panel_index+1}: {action}"))
                     
-                    # Update game state
-                    self.game_state = result["game_state"]
+                        # Update game state
+                        self.game_state = result["game_state"]
                     
-                    # Add status after significant actions
-                    if any(keyword in action.lower() for keyword in ["shoot", "plant", "defuse", "move"]):
-                        status = self.game_state.get("game_status", "")
-                        self.chat_logs[panel_index].append(f"📊 {status}")
+                        # Add status after significant actions
+                        if any(keyword in action for keyword in STATUS_KEYWORDS):
+                            status = self.game_state.get("game_status", "")
+                            self.chat_logs[panel_index].append(f"📊 {status}")
                     
-                    # Handle round/game end
-                    if self.game_state.get("is_round_over"):
-                        winner = self.game_state.get("winner", "Unknown")
-                        round_num = self.game_state.get("round", 1)
-                        winner_msg = f"🏆 Round {round_num} won by {winner}!"
-                        
-                        for j in range(self.num_instances):
-                            self.chat_logs[j].append(winner_msg)
-                        if self.ct_chat:
-                            self.ct_chat.append(winner_msg)
+                        # Handle round/game end
+                        if self.game_state.get("is_round_over"):
+                            winner = self.game_state.get("winner", "Unknown")
+                            round_num = self.game_state.get("round", 1)
+                            winner_msg = f"🏆 Round {round_num} won by {winner}!"
                         
-                        if self.game_state.get("is_game_over"):
-                            game_over_msg = "🎯 GAME OVER!"
-                            for j in range(self.num_instances):
-                                self.chat_logs[j].append(game_over_msg)
+                            self._team_log.append((None, winner_msg))
                             if self.ct_chat:
-                                self.ct_chat.append(game_over_msg)
-            
-            # Limit chat log length
-            if len(self.chat_logs[panel_index]) > 12:
-                self.chat_logs[panel_index] = self.chat_logs[panel_index][-12:]
-                
+                                self.ct_chat.append(winner_msg)
+                        
+                            if self.game_state.get("is_game_over"):
+                                game_over_msg = "🎯 GAME OVER!"
+                                self._team_log.append((None, game_over_msg))
+                                if self.ct_chat:
+                                    self.ct_chat.append(game_over_msg)
+
         except Exception as e:
             self.chat_logs[panel_index].append(f"Error: {str(e)[:100]}...")
 
@@ -304,79 +474,67 @@ class DockerizedUI:
             return
             
         self.ct_chat.append(f"You: {text}")
-        action = text.lower().strip()
-        
-        if action.startswith("action:"):
-            action = action.split(":", 1)[1].strip()
+        action, head, _ = self._parse_command(text)
         
         try:
-            if action.startswith("cheat:"):
+            if head == "cheat":
                 await self.handle_ct_cheat_command(action)
             else:
-                result = await self.api_client.apply_action(
-                    self.session_id,
-                    "Counter-Terrorists", 
-                    "player", 
-                    action
-                )
-                
-                self.ct_chat.append(result["result"])
-                self.game_state = result["game_state"]
+                # Actions apply in submission order and own the game_state write
+                async with self._state_lock:
+                    result = await self.api_client.apply_action(
+                        self.session_id,
+                        "Counter-Terrorists", 
+                        "player", 
+                        action
+                    )
                 
-                if any(keyword in action.lower() for keyword in ["shoot", "plant", "defuse", "move"]):
-                    status = self.game_state.get("game_status", "")
-                    self.ct_chat.append(f"📊 {status}")
-            
-            if len(self.ct_chat) > 12:
-                self.ct_chat = self.ct_chat[-12:]
+                    self.ct_chat.append(result["result"])
+                    self.game_state = result["game_state"]
                 
+                    if any(keyword in action for keyword in STATUS_KEYWORDS):
+                        status = self.game_state.get("game_status", "")
+                        self.ct_chat.append(f"📊 {status}")
+
         except Exception as e:
             self.ct_chat.append(f"Error: {str(e)[:100]}...")
 
-    async def handle_cheat_command(self, panel_index: int, action: str):
+    def _format_hp(self) -> str:
+        """"team=m:hp,... | ..." for the current game state."""
+        return " | ".join(
+            team + "=" + ",".join(f"{m}:{hp}" for m, hp in members.items())
+            for team, members in self.game_state.get("player_health", {}).items()
+        )
+
+    def _handle_cheat(self, chat: Union[PanelLog, Deque[str]], action: str):
         cmd = action.split(":", 1)[1].strip()
         
         if cmd in ("status", "site"):
             if self.game_state.get("bomb_planted"):
                 site = self.game_state.get("bomb_site", "unknown")
-                self.chat_logs[panel_index].append(f"CHEAT: Bomb at {site}")
+                chat.append(f"CHEAT: Bomb at {site}")
             else:
-                self.chat_logs[panel_index].append("CHEAT: Bomb not planted")
+                chat.append("CHEAT: Bomb not planted")
         
         elif cmd == "hp":
-            player_health = self.game_state.get("player_health", {})
-            snap = []
-            for team, members in player_health.items():
-                snap.append(team + "=" + ",".join(f"{m}:{hp}" for m, hp in members.items()))
-            self.chat_logs[panel_index].append("CHEAT: " + " | ".join(snap))
+            chat.append("CHEAT: " + self._format_hp())
         
         else:
-            self.chat_logs[panel_index].append("CHEAT: unknown command")
+            chat.append("CHEAT: unknown command")
+
+    async def handle_cheat_command(self, panel_index: int, action: str):
+        self._handle_cheat(self.chat_logs[panel_index], action)
 
     async def handle_ct_cheat_command(self, action: str):
         if not self.ct_chat:
             return
-            
-        cmd = action.split(":", 1)[1].strip()
-        
-        if cmd in ("status", "site"):
-            if self.game_state.get("bomb_planted"):
-                site = self.game_state.get("bomb_site", "unknown")
-                self.ct_chat.append(f"CHEAT: Bomb at {site}")
-            else:
-                self.ct_chat.append("CHEAT: Bomb not planted")
-        
-        elif cmd == "hp":
-            player_health = self.game_state.get("player_health", {})
-            snap = []
-            for team, members in player_health.items():
-                snap.append(team + "=" + ",".join(f"{m}:{hp}" for m, hp in members.items()))
-            self.ct_chat.append("CHEAT: " + " | ".join(snap))
-        
-        else:
-            self.ct_chat.append("CHEAT: unknown command")
+        self._handle_cheat(self.ct_chat, action)
 
     async def cleanup(self):
+        if self._agent_batcher_task:
+            self._agent_batcher_task.cancel()
+        for task in self._background:
+            task.cancel()
         await self.api_client.close()
         pygame.quit()
 
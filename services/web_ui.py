@@ -1,14 +1,67 @@
 import os
-import json
 import asyncio
-from typing import List, Dict, Any, Optional
+import logging
+import logging.handlers
+from queue import SimpleQueue
+from collections import deque
+from typing import Deque, List, Dict, Any, Optional, Set, Tuple
 from datetime import datetime
 
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 import httpx
+import orjson
+
+# Log records are queued on the event loop and written by a listener thread
+logger = logging.getLogger("web_ui")
+logger.propagate = False
+_log_queue: SimpleQueue = SimpleQueue()
+logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+log_listener = logging.handlers.QueueListener(_log_queue, logging.StreamHandler())
+
+# Per-service timeouts: connect/pool stalls fail fast, reads keep the full budget
+API_TIMEOUT = httpx.Timeout(10.0, connect=3.0, read=10.0, write=5.0, pool=5.0)
+AGENT_TIMEOUT = httpx.Timeout(30.0, connect=3.0, read=30.0, write=5.0, pool=5.0)
+# Keep idle sockets alive between user actions so panel bursts reuse them
+HTTP_LIMITS = httpx.Limits(
+    max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "100")),
+    max_keepalive_connections=int(os.getenv("HTTP_MAX_KEEPALIVE", "100")),
+    keepalive_expiry=float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60")),
+)
+
+# Lines kept per chat panel
+CHAT_LOG_MAX = 12
+
+# Static help lines seeded into every terrorist panel / the CT panel
+T_HELP_LINES = (
+    "Commands: 'shoot player/bot', 'plant bomb', 'move to A-site', 'defuse bomb'",
+    "AI Help: 'rag:', 'ag2:', 'smart:', 'critic:', 'quant:', 'som:', 'kb:add', 'kb:load <file>', 'kb:clear', 'ask:'"
+)
+CT_HELP_LINES = (
+    "Commands: 'shoot player/bot', 'defuse bomb', 'move to A-site/B-site'",
+    "Objective: Prevent bomb plant or defuse if planted!"
+)
+
+# Panel command prefix -> agent service agent_type
+AGENT_TYPE_MAP = {
+    "rag": "rag",
+    "ag2": "ag2",
+    "smart": "smart",
+    "critic": "critic",
+    "quant": "quantifier",
+    "som": "som",
+}
+# Panel command prefix -> (agent_type, chat label), resolved once at import
+AGENT_ROUTES: Dict[str, Tuple[str, str]] = {
+    prefix: (agent_type, prefix.upper()) for prefix, agent_type in AGENT_TYPE_MAP.items()
+}
+# Actions (already lowercased) that are followed by a game status line
+STATUS_KEYWORDS = ("shoot", "plant", "defuse", "move")
+
+# Pending state snapshots buffered per WebSocket client
+WS_QUEUE_MAX = 8
 
 
 class WebUIService:
@@ -20,312 +73,325 @@ class WebUIService:
         
         # UI state for multiple panels
         self.num_panels = 3
-        self.chat_logs: List[List[str]] = [[] for _ in range(self.num_panels)]
+        self.chat_logs: List[Deque[str]] = [deque(maxlen=CHAT_LOG_MAX) for _ in range(self.num_panels)]
         self.rag_tries: List[int] = [5 for _ in range(self.num_panels)]
-        self.ct_chat: List[str] = []
+        self.ct_chat: Deque[str] = deque(maxlen=CHAT_LOG_MAX)
+        
+        # Canonical UI state; panels reference the live chat deques, which are only mutated in place
+        self._ui_state: Dict[str, Any] = {
+            "session_id": None,
+            "game_state": {},
+            "terrorist_panels": [
+                {"panel_id": i, "chat_log": self.chat_logs[i], "rag_tries": self.rag_tries[i]}
+                for i in range(self.num_panels)
+            ],
+            "ct_panel": {"chat_log": self.ct_chat}
+        }
+        
+        # Update queues of the connected WebSocket clients
+        self.connections: Set[asyncio.Queue] = set()
+        
+        # Serialized get_ui_state(), None when stale
+        self._state_json: Optional[bytes] = None
         
-        # WebSocket connections
-        self.connections: List[WebSocket] = []
+        # Pooled HTTP clients, opened at app startup
+        self.api_client: Optional[httpx.AsyncClient] = None
+        self.agent_client: Optional[httpx.AsyncClient] = None
+
+    async def start_clients(self):
+        """Open the shared keep-alive clients for the API and agent services"""
+        self.api_client = httpx.AsyncClient(
+            base_url=self.api_url, limits=HTTP_LIMITS, timeout=API_TIMEOUT
+        )
+        self.agent_client = httpx.AsyncClient(
+            base_url=self.agent_url, limits=HTTP_LIMITS, timeout=AGENT_TIMEOUT
+        )
+
+    async def close(self):
+        """Close the shared HTTP clients"""
+        for client in (self.api_client, self.agent_client):
+            if client:
+                await client.aclose()
+        self.api_client = self.agent_client = None
+
+    def subscribe(self) -> asyncio.Queue:
+        """Register a WebSocket client and return its update queue"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=WS_QUEUE_MAX)
+        self.connections.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        """Forget a WebSocket client's update queue"""
+        self.connections.discard(queue)
+
+    async def get_state_json(self) -> bytes:
+        """UI state serialized to UTF-8 JSON, cached until the next state change"""
+        if self._state_json is None:
+            self._state_json = orjson.dumps(await self.get_ui_state(), default=list)
+        return self._state_json
 
     async def broadcast_update(self):
         """Immediately broadcast state update to all connected clients"""
+        # Callers have just changed the state
+        self._state_json = None
         if not self.connections:
             return
         
-        state = await self.get_ui_state()
-        message = json.dumps(state)
-        
-        # Send to all connected clients
-        disconnected = []
-        for connection in self.connections:
-            try:
-                await connection.send_text(message)
-            except:
-                disconnected.append(connection)
+        message = await self.get_state_json()
         
-        # Remove disconnected clients
-        for conn in disconnected:
-            if conn in self.connections:
-                self.connections.remove(conn)
+        # Hand the snapshot to every client's queue; a full queue drops its oldest snapshot
+        for queue in tuple(self.connections):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(message)
+
+    @staticmethod
+    def _parse_command(text: str) -> Tuple[str, str, str]:
+        """Lowercased action (minus any "action:" prefix) and its (head, rest) around the first colon"""
+        action = text.lower().strip()
+        head, sep, rest = action.partition(":")
+        if sep and head == "action":
+            action = rest.strip()
+            head, sep, rest = action.partition(":")
+        return action, (head if sep else ""), rest
+
+    def _seed_chat_logs(self, status: str):
+        """Reset every panel to its status line followed by the help lines"""
+        for i, chat_log in enumerate(self.chat_logs):
+            chat_log.clear()
+            chat_log.extend((f"T{i+1}: {status}", *T_HELP_LINES))
+        self.ct_chat.clear()
+        self.ct_chat.extend((f"CT: {status}", *CT_HELP_LINES))
 
     async def initialize_session(self):
         """Create a new game session"""
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.post(
-                    f"{self.api_url}/sessions",
-                    json={
-                        "session_name": f"Web Session {datetime.now().strftime('%H:%M:%S')}",
-                        "max_rounds": 3
-                    }
-                )
-                if response.status_code == 200:
-                    session_data = response.json()
-                    self.session_id = session_data["id"]
-                    
-                    # Get initial game state
-                    state_response = await client.get(f"{self.api_url}/sessions/{self.session_id}/state")
-                    if state_response.status_code == 200:
-                        self.game_state = state_response.json()
-                    
-                    # Initialize chat logs
-                    for i in range(self.num_panels):
-                        self.chat_logs[i] = [
-                            f"T{i+1}: Ready! Session",
-                            "Commands: 'shoot player/bot', 'plant bomb', 'move to A-site', 'defuse bomb'",
-                            "AI Help: 'rag:', 'ag2:', 'smart:', 'critic:', 'quant:', 'som:', 'kb:add', 'kb:load <file>', 'kb:clear', 'ask:'"
-                        ]
-                    
-                    self.ct_chat = [
-                        f"CT: Ready! Session",
-                        "Commands: 'shoot player/bot', 'defuse bomb', 'move to A-site/B-site'",
-                        "Objective: Prevent bomb plant or defuse if planted!"
-                    ]
-                    
-                    return True
-            except Exception as e:
-                print(f"Failed to initialize session: {e}")
-                # Create a fallback session ID
-                import uuid
-                self.session_id = str(uuid.uuid4())
-                for i in range(self.num_panels):
-                    self.chat_logs[i] = [
-                        f"T{i+1}: Demo Mode - Backend services starting...",
-                        "Commands: 'shoot player/bot', 'plant bomb', 'move to A-site'",
-                        "AI Help: 'rag:', 'ag2:', 'smart:', 'critic:', 'quant:', 'som:', 'kb:add', 'kb:load <file>', 'kb:clear', 'ask:'"
-                    ]
-                self.ct_chat = [
-                    "CT: Demo Mode - Backend services starting...",
-                    "Commands: 'shoot player/bot', 'defuse bomb'",
-                    "Objective: Prevent bomb plant or defuse if planted!"
-                ]
+        try:
+            response = await self.api_client.post(
+                "/sessions",
+                json={
+                    "session_name": f"Web Session {datetime.now().strftime('%H:%M:%S')}",
+                    "max_rounds": 3
+                }
+            )
+            if response.status_code == 200:
+                session_data = response.json()
+                self.session_id = session_data["id"]
+                
+                # Get initial game state
+                state_response = await self.api_client.get(f"/sessions/{self.session_id}/state")
+                if state_response.status_code == 200:
+                    self.game_state = state_response.json()
+                
+                self._seed_chat_logs("Ready! Session")
+                self._state_json = None
+                return True
+        except Exception as e:
+            logger.warning("Failed to initialize session: %s", e)
+            # Create a fallback session ID
+            import uuid
+            self.session_id = str(uuid.uuid4())
+            self._seed_chat_logs("Demo Mode - Backend services starting...")
+            self._state_json = None
         return False
 
     async def handle_terrorist_input(self, panel_index: int, text: str) -> Dict[str, Any]:
         """Handle input from terrorist panel"""
+        self._state_json = None
         self.chat_logs[panel_index].append(f"You: {text}")
-        action = text.lower().strip()
-        
-        if action.startswith("action:"):
-            action = action.split(":", 1)[1].strip()
+        action, head, rest = self._parse_command(text)
         
         try:
             # Handle AI queries
-            if action.startswith(("rag:", "ag2:", "smart:", "critic:", "quant:", "som:")):
+            route = AGENT_ROUTES.get(head)
+            if route:
                 if self.rag_tries[panel_index] <= 0:
                     self.chat_logs[panel_index].append("AI: No tries left.")
                     return {"success": False, "message": "No tries left"}
                 
                 self.rag_tries[panel_index] -= 1
-                agent_type = action.split(":")[0]
-                query = action.split(":", 1)[1].strip()
-                
-                # Map agent types
-                agent_type_map = {
-                    "rag": "rag",
-                    "ag2": "ag2", 
-                    "smart": "smart",
-                    "critic": "critic",
-                    "quant": "quantifier",
-                    "som": "som"
-                }
-                
-                mapped_type = agent_type_map.get(agent_type, agent_type)
+                mapped_type, label = route
+                query = rest.strip()
                 
                 try:
-                    async with httpx.AsyncClient(timeout=30.0) as client:
-                        response = await client.post(
-                            f"{self.agent_url}/process",
-                            json={
-                                "agent_type": mapped_type,
-                                "query": query,
-                                "context": self.game_state
-                            }
-                        )
-                        
-                        if response.status_code == 200:
-                            result = response.json()
-                            if result["success"]:
-                                self.chat_logs[panel_index].append(
-                                    f"{agent_type.upper()}: {result['response']} ({self.rag_tries[panel_index]} tries left)"
-                                )
-                            else:
-                                self.chat_logs[panel_index].append(
-                                    f"{agent_type.upper()} Error: {result['error'][:100]}... ({self.rag_tries[panel_index]} tries left)"
-                                )
+                    response = await self.agent_client.post(
+                        "/process",
+                        json={
+                            "agent_type": mapped_type,
+                            "query": query,
+                            "context": self.game_state
+                        }
+                    )
+                    
+                    if response.status_code == 200:
+                        result = response.json()
+                        if result["success"]:
+                            self.chat_logs[panel_index].append(
+                                f"{label}: {result['response']} ({self.rag_tries[panel_index]} tries left)"
+                            )
                         else:
-                            self.chat_logs[panel_index].append(f"{agent_type.upper()} Error: Service unavailable")
+                            self.chat_logs[panel_index].append(
+                                f"{label} Error: {result['error'][:100]}... ({self.rag_tries[panel_index]} tries left)"
+                            )
+                    else:
+                        self.chat_logs[panel_index].append(f"{label} Error: Service unavailable")
                 except Exception as e:
-                    self.chat_logs[panel_index].append(f"{agent_type.upper()} Error: {str(e)[:100]}...")
+                    self.chat_logs[panel_index].append(f"{label} Error: {str(e)[:100]}...")
             
             # Handle knowledge base commands
-            elif action.startswith("kb:add"):
+            elif head == "kb" and rest.startswith("add"):
                 parts = text.strip().split(" ", 1)
                 if len(parts) > 1 and parts[1]:
                     try:
-                        async with httpx.AsyncClient(timeout=30.0) as client:
-                            response = await client.post(
-                                f"{self.agent_url}/kb/add",
-                                json={"text": parts[1]}
-                            )
-                            if response.status_code == 200:
-                                result = response.json()
-                                self.chat_logs[panel_index].append(f"KB: added {result.get('count', 1)} snippets")
-                            else:
-                                self.chat_logs[panel_index].append("KB Error: Failed to add text")
+                        response = await self.agent_client.post(
+                            "/kb/add",
+                            json={"text": parts[1]}
+                        )
+                        if response.status_code == 200:
+                            result = response.json()
+                            self.chat_logs[panel_index].append(f"KB: added {result.get('count', 1)} snippets")
+                        else:
+                            self.chat_logs[panel_index].append("KB Error: Failed to add text")
                     except Exception as e:
                         self.chat_logs[panel_index].append(f"KB Error: {str(e)[:50]}...")
                 else:
                     self.chat_logs[panel_index].append("KB Error: No text provided to add.")
             
-            elif action.startswith("kb:load "):
-                file_path = action.split(" ", 1)[1].strip()
+            elif head == "kb" and rest.startswith("load "):
+                file_path = rest[len("load "):].strip()
                 try:
-                    async with httpx.AsyncClient(timeout=30.0) as client:
-                        response = await client.post(
-                            f"{self.agent_url}/kb/load",
-                            json={"file_path": file_path}
-                        )
-                        if response.status_code == 200:
-                            result = response.json()
-                            self.chat_logs[panel_index].append(f"KB: loaded {result.get('count', 0)} chunks")
-                        else:
-                            self.chat_logs[panel_index].append("KB Error: Failed to load file")
+                    response = await self.agent_client.post(
+                        "/kb/load",
+                        json={"file_path": file_path}
+                    )
+                    if response.status_code == 200:
+                        result = response.json()
+                        self.chat_logs[panel_index].append(f"KB: loaded {result.get('count', 0)} chunks")
+                    else:
+                        self.chat_logs[panel_index].append("KB Error: Failed to load file")
                 except Exception as e:
                     self.chat_logs[panel_index].append(f"KB Error: {str(e)[:50]}...")
             
-            elif action.strip() == "kb:clear":
+            elif head == "kb" and rest == "clear":
                 try:
-                    async with httpx.AsyncClient(timeout=30.0) as client:
-                        response = await client.post(f"{self.agent_url}/kb/clear")
-                        if response.status_code == 200:
-                            self.chat_logs[panel_index].append("KB: cleared")
-                        else:
-                            self.chat_logs[panel_index].append("KB Error: Failed to clear")
+                    response = await self.agent_client.post("/kb/clear")
+                    if response.status_code == 200:
+                        self.chat_logs[panel_index].append("KB: cleared")
+                    else:
+                        self.chat_logs[panel_index].append("KB Error: Failed to clear")
                 except Exception as e:
                     self.chat_logs[panel_index].append(f"KB Error: {str(e)[:50]}...")
             
-            elif action.startswith("ask:"):
-                query = action.split(":", 1)[1].strip()
+            elif head == "ask":
+                query = rest.strip()
                 try:
-                    async with httpx.AsyncClient(timeout=30.0) as client:
-                        response = await client.post(
-                            f"{self.agent_url}/kb/ask",
-                            json={"query": query}
-                        )
-                        if response.status_code == 200:
-                            result = response.json()
-                            answer = result.get('answer', 'no match')
-                            self.chat_logs[panel_index].append(f"KB: {answer}")
-                        else:
-                            self.chat_logs[panel_index].append("KB Error: Failed to query")
+                    response = await self.agent_client.post(
+                        "/kb/ask",
+                        json={"query": query}
+                    )
+                    if response.status_code == 200:
+                        result = response.json()
+                        answer = result.get('answer', 'no match')
+                        self.chat_logs[panel_index].append(f"KB: {answer}")
+                    else:
+                        self.chat_logs[panel_index].append("KB Error: Failed to query")
                 except Exception as e:
                     self.chat_logs[panel_index].append(f"KB Error: {str(e)[:50]}...")
             
             # Handle cheat commands
-            elif action.startswith("cheat:"):
+            elif head == "cheat":
                 await self.handle_cheat_command(panel_index, action)
             
             # Handle regular game actions
             else:
                 try:
-                    async with httpx.AsyncClient(timeout=10.0) as client:
-                        response = await client.post(
-                            f"{self.api_url}/sessions/{self.session_id}/actions",
-                            json={
-                                "session_id": self.session_id,
-                                "team": "Terrorists",
-                                "player": "player",
-                                "action": action
-                            }
-                        )
+                    response = await self.api_client.post(
+                        f"/sessions/{self.session_id}/actions",
+                        json={
+                            "session_id": self.session_id,
+                            "team": "Terrorists",
+                            "player": "player",
+                            "action": action
+                        }
+                    )
+                    
+                    if response.status_code == 200:
+                        result = response.json()
                         
-                        if response.status_code == 200:
-                            result = response.json()
+                        if not result["result"].startswith("Invalid action:"):
+                            self.chat_logs[panel_index].append(result["result"])
                             
-                            if not result["result"].startswith("Invalid action:"):
-                                self.chat_logs[panel_index].append(result["result"])
-                                
-                                # Broadcast to other terrorist panels
-                                for j in range(self.num_panels):
-                                    if j != panel_index:
-                                        self.chat_logs[j].append(f"T{panel_index+1}: {action}")
-                                
-                                # Update game state
-                                self.game_state = result.get("game_state", self.game_state)
-                                
-                                # Add status after significant actions
-                                if any(keyword in action.lower() for keyword in ["shoot", "plant", "defuse", "move"]):
-                                    status = self.game_state.get("game_status", "")
-                                    if status:
-                                        self.chat_logs[panel_index].append(f"📊 {status}")
-                        else:
-                            self.chat_logs[panel_index].append(f"Action failed: HTTP {response.status_code}")
+                            # Broadcast to other terrorist panels
+                            for j in range(self.num_panels):
+                                if j != panel_index:
+                                    self.chat_logs[j].append(f"T{panel_index+1}: {action}")
+                            
+                            # Update game state
+                            self.game_state = result.get("game_state", self.game_state)
+                            
+                            # Add status after significant actions
+                            if any(keyword in action for keyword in STATUS_KEYWORDS):
+                                status = self.game_state.get("game_status", "")
+                                if status:
+                                    self.chat_logs[panel_index].append(f"📊 {status}")
+                    else:
+                        self.chat_logs[panel_index].append(f"Action failed: HTTP {response.status_code}")
                 except Exception as e:
                     self.chat_logs[panel_index].append(f"Action error: {str(e)[:100]}...")
             
-            # Limit chat log length
-            if len(self.chat_logs[panel_index]) > 12:
-                self.chat_logs[panel_index] = self.chat_logs[panel_index][-12:]
-            
             # Immediately broadcast update to all clients
             await self.broadcast_update()
-                
+            
             return {"success": True, "message": "Action processed"}
-                
+        
         except Exception as e:
             error_msg = f"Error: {str(e)[:100]}..."
+            self._state_json = None
             self.chat_logs[panel_index].append(error_msg)
             return {"success": False, "message": error_msg}
 
     async def handle_ct_input(self, text: str) -> Dict[str, Any]:
         """Handle input from CT panel"""
+        self._state_json = None
         self.ct_chat.append(f"You: {text}")
-        action = text.lower().strip()
-        
-        if action.startswith("action:"):
-            action = action.split(":", 1)[1].strip()
+        action, head, _ = self._parse_command(text)
         
         try:
-            if action.startswith("cheat:"):
+            if head == "cheat":
                 await self.handle_ct_cheat_command(action)
             else:
                 try:
-                    async with httpx.AsyncClient(timeout=10.0) as client:
-                        response = await client.post(
-                            f"{self.api_url}/sessions/{self.session_id}/actions",
-                            json={
-                                "session_id": self.session_id,
-                                "team": "Counter-Terrorists",
-                                "player": "player",
-                                "action": action
-                            }
-                        )
+                    response = await self.api_client.post(
+                        f"/sessions/{self.session_id}/actions",
+                        json={
+                            "session_id": self.session_id,
+                            "team": "Counter-Terrorists",
+                            "player": "player",
+                            "action": action
+                        }
+                    )
+                    
+                    if response.status_code == 200:
+                        result = response.json()
+                        self.ct_chat.append(result["result"])
+                        self.game_state = result.get("game_state", self.game_state)
                         
-                        if response.status_code == 200:
-                            result = response.json()
-                            self.ct_chat.append(result["result"])
-                            self.game_state = result.get("game_state", self.game_state)
-                            
-                            if any(keyword in action.lower() for keyword in ["shoot", "plant", "defuse", "move"]):
-                                status = self.game_state.get("game_status", "")
-                                if status:
-                                    self.ct_chat.append(f"📊 {status}")
-                        else:
-                            self.ct_chat.append(f"Action failed: HTTP {response.status_code}")
+                        if any(keyword in action for keyword in STATUS_KEYWORDS):
+                            status = self.game_state.get("game_status", "")
+                            if status:
+                                self.ct_chat.append(f"📊 {status}")
+                    else:
+                        self.ct_chat.append(f"Action failed: HTTP {response.status_code}")
                 except Exception as e:
                     self.ct_chat.append(f"Action error: {str(e)[:100]}...")
             
-            if len(self.ct_chat) > 12:
-                self.ct_chat = self.ct_chat[-12:]
-            
             # Immediately broadcast update to all clients
             await self.broadcast_update()
-                
+            
             return {"success": True, "message": "Action processed"}
-                
+        
         except Exception as e:
             error_msg = f"Error: {str(e)[:100]}..."
+            self._state_json = None
             self.ct_chat.append(error_msg)
             return {"success": False, "message": error_msg}
 
@@ -378,22 +444,16 @@ class WebUIService:
             self.ct_chat.append("CHEAT: unknown command")
 
     async def get_ui_state(self) -> Dict[str, Any]:
-        """Get current UI state for web interface"""
-        return {
-            "session_id": self.session_id,
-            "game_state": self.game_state,
-            "terrorist_panels": [
-                {
-                    "panel_id": i,
-                    "chat_log": self.chat_logs[i],
-                    "rag_tries": self.rag_tries[i]
-                }
-                for i in range(self.num_panels)
-            ],
-            "ct_panel": {
-                "chat_log": self.ct_chat
-            }
-        }
+        """Get current UI state for web interface.
+        
+        Returns the live state dict (chat logs are deques), refreshed in place.
+        """
+        state = self._ui_state
+        state["session_id"] = self.session_id
+        state["game_state"] = self.game_state
+        for panel, tries in zip(state["terrorist_panels"], self.rag_tries):
+            panel["rag_tries"] = tries
+        return state
 
 
 # Global web UI service instance
@@ -409,9 +469,17 @@ templates = Jinja2Templates(directory="templates")
 
 @app.on_event("startup")
 async def startup_event():
+    log_listener.start()
+    await web_ui.start_clients()
     await web_ui.initialize_session()
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    await web_ui.close()
+    log_listener.stop()
+
+
 @app.get("/", response_class=HTMLResponse)
 async def get_ui(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
@@ -419,7 +487,7 @@ async def get_ui(request: Request):
 
 @app.get("/api/state")
 async def get_state():
-    return await web_ui.get_ui_state()
+    return Response(content=await web_ui.get_state_json(), media_type="application/json")
 
 
 @app.post("/api/terrorist/{panel_id}/input")
@@ -434,19 +502,47 @@ async def ct_input(data: dict):
     return result
 
 
+async def _push_updates(websocket: WebSocket, queue: asyncio.Queue):
+    """Send each broadcast snapshot to one client until sending fails"""
+    while True:
+        message = await queue.get()
+        # Snapshots are full states, so a backlog collapses to the newest one
+        while not queue.empty():
+            message = queue.get_nowait()
+        await websocket.send_bytes(message)
+
+
+async def _wait_disconnect(websocket: WebSocket):
+    """Read (and ignore) client frames until the client goes away"""
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            return
+
+
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
-    web_ui.connections.append(websocket)
+    queue = web_ui.subscribe()
+    tasks: Set[asyncio.Task] = set()
     
     try:
-        while True:
-            # Send periodic updates
-            state = await web_ui.get_ui_state()
-            await websocket.send_text(json.dumps(state))
-            await asyncio.sleep(2)
-    except WebSocketDisconnect:
-        web_ui.connections.remove(websocket)
+        # Initial snapshot, then push only when a handler broadcasts a change
+        await websocket.send_bytes(await web_ui.get_state_json())
+        # Race the pusher against a receive loop, so an idle client's disconnect is noticed at once
+        tasks = {
+            asyncio.create_task(_push_updates(websocket, queue)),
+            asyncio.create_task(_wait_disconnect(websocket)),
+        }
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            task.exception()  # Send errors and disconnects both just end the session
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        for task in tasks:
+            task.cancel()
+        web_ui.unsubscribe(queue)
 
 
 if __name__ == "__main__":
@@ -9,6 +9,7 @@ class CounterStrikeUI {
         this.lastChatLengths = [0, 0, 0, 0]; // Track chat lengths for each panel
         this.soundEnabled = true; // Sound effects enabled by default
         this.audioContext = null;
+        this.textDecoder = new TextDecoder();
         
         this.init();
     }
@@ -25,6 +26,8 @@ class CounterStrikeUI {
         
         try {
             this.websocket = new WebSocket(wsUrl);
+            // State snapshots arrive as binary UTF-8 JSON frames
+            this.websocket.binaryType = 'arraybuffer';
             
             this.websocket.onopen = () => {
                 console.log('WebSocket connected');
@@ -37,7 +40,8 @@ class CounterStrikeUI {
             };
             
             this.websocket.onmessage = (event) => {
-                const data = JSON.parse(event.data);
+                const raw = typeof event.data === 'string' ? event.data : this.textDecoder.decode(event.data);
+                const data = JSON.parse(raw);
                 this.updateUI(data);
             };
             
@@ -2,14 +2,42 @@
 """
 Test script to verify LLM API calls are working.
 """
+import asyncio
 import os
 
-from counter_strike_ag2_agent.agents import (create_terrorists_group,
+from autogen import AssistantAgent  # type: ignore
+
+from counter_strike_ag2_agent.agents import (USABLE_CONFIG_LIST,
+                                             create_terrorists_group,
                                              get_active_providers)
 from counter_strike_ag2_agent.game_state import GameState
 from counter_strike_ag2_agent.rag import RagTerroristHelper
 
 
+async def probe_providers(bot_agent, messages):
+    """Send the same messages to every active provider concurrently.
+
+    Returns: {provider: reply or exception}.
+    """
+    configs = {}
+    for item in USABLE_CONFIG_LIST:
+        provider = str(item.get("api_type", "")).lower() or "openai"
+        configs.setdefault(provider, []).append(item)
+    bots = {
+        provider: AssistantAgent(
+            name=f"{bot_agent.name}_{provider}",
+            system_message=bot_agent.system_message,
+            llm_config={"config_list": cfg_list},
+        )
+        for provider, cfg_list in configs.items()
+    }
+    replies = await asyncio.gather(
+        *(asyncio.to_thread(bot.generate_reply, messages=messages, sender=None) for bot in bots.values()),
+        return_exceptions=True,
+    )
+    return dict(zip(bots, replies))
+
+
 def test_llm_setup():
     """Test if LLM API calls are properly configured."""
     print("🔧 Testing LLM API Configuration...")
@@ -64,16 +92,20 @@ def test_llm_setup():
             
             user_message = {"content": context, "role": "user"}
             
-            print("📤 Sending request to LLM...")
-            response = bot_agent.generate_reply(messages=[user_message], sender=None)
+            print("📤 Sending request to every provider...")
+            results = asyncio.run(probe_providers(bot_agent, [user_message]))
             
-            if response:
-                print(f"✅ LLM Response received!")
-                print(f"📝 Response: {str(response)[:200]}...")
-                return True
-            else:
-                print(f"❌ No response from LLM")
-                return False
+            ok = False
+            for provider, response in results.items():
+                if isinstance(response, Exception):
+                    print(f"❌ {provider}: {response}")
+                elif response:
+                    ok = True
+                    print(f"✅ {provider}: LLM Response received!")
+                    print(f"📝 Response: {str(response)[:200]}...")
+                else:
+                    print(f"❌ {provider}: No response from LLM")
+            return ok
         else:
             print(f"❌ Could not find bot agent")
             return False
@@ -1,9 +1,51 @@
 import os
+import socket
 import sys
 
+import pytest
+
 # Ensure project root is importable when running tests from CI or different CWDs
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
 if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
 
+def pytest_configure(config):
+    # pytest.ini uses a [tool:pytest] header, so register the markers run_tests.py selects on here too
+    config.addinivalue_line("markers", "error_path: marks tests exercising error and fallback paths")
+    config.addinivalue_line("markers", "edge_case: marks tests exercising boundary conditions")
+
+
+def _port_open(port: int) -> bool:
+    try:
+        socket.create_connection(("localhost", port), timeout=0.2).close()
+        return True
+    except OSError:
+        return False
+
+
+# Single-service checks in TestDockerServices and the port each one talks to
+_SERVICE_PORTS = {
+    "TestDockerServices::test_postgres_connection": (5432, "PostgreSQL"),
+    "TestDockerServices::test_chromadb_connection": (8000, "ChromaDB"),
+}
+
+
+def pytest_collection_modifyitems(config, items):
+    # Skip the dockerized API/agent tests up front when neither service is listening,
+    # instead of setting up clients and fixtures for each test only to skip it
+    docker_items = [item for item in items if "TestDockerIntegration" in item.nodeid]
+    if docker_items and not (_port_open(8080) or _port_open(8081)):
+        skip = pytest.mark.skip(reason="Docker API/agent services are not running")
+        for item in docker_items:
+            item.add_marker(skip)
+
+    # Likewise for the per-service checks, each probed once on its own port
+    probed = {}
+    for item in items:
+        for suffix, (port, service) in _SERVICE_PORTS.items():
+            if item.nodeid.endswith(suffix):
+                if port not in probed:
+                    probed[port] = _port_open(port)
+                if not probed[port]:
+                    item.add_marker(pytest.mark.skip(reason=f"{service} is not listening on port {port}"))
@@ -3,11 +3,22 @@
 Script to inspect and extract data from ChromaDB.
 """
 import os
+from typing import Optional
 
 from counter_strike_ag2_agent.rag_vector import ChromaRAG
 
+_rag: Optional[ChromaRAG] = None
 
-def inspect_chromadb():
+
+def get_rag() -> ChromaRAG:
+    """Return the shared ChromaRAG, opening the client and embedder on first use."""
+    global _rag
+    if _rag is None:
+        _rag = ChromaRAG()
+    return _rag
+
+
+def inspect_chromadb(rag: Optional[ChromaRAG] = None):
     """Inspect the ChromaDB database and show all stored data."""
     print("🔍 Inspecting ChromaDB Database...")
     
@@ -18,7 +29,7 @@ def inspect_chromadb():
     
     try:
         # Connect to the default collection
-        rag = ChromaRAG()
+        rag = rag or get_rag()
         
         print(f"✅ Connected to ChromaDB")
         print(f"📁 Collection: {rag.col.name}")
@@ -66,10 +77,10 @@ def inspect_chromadb():
         print(f"❌ Error connecting to ChromaDB: {e}")
 
 
-def export_chromadb_to_text():
+def export_chromadb_to_text(rag: Optional[ChromaRAG] = None):
     """Export all ChromaDB data to a text file."""
     try:
-        rag = ChromaRAG()
+        rag = rag or get_rag()
         results = rag.col.get()
         
         if not results['documents']:
@@ -97,10 +108,10 @@ def export_chromadb_to_text():
         print(f"❌ Export failed: {e}")
 
 
-def search_chromadb(query):
+def search_chromadb(query, rag: Optional[ChromaRAG] = None):
     """Search ChromaDB with a specific query."""
     try:
-        rag = ChromaRAG()
+        rag = rag or get_rag()
         
         # Direct search with similarity
         results = rag.col.query(
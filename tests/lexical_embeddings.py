@@ -0,0 +1,43 @@
+"""
+Offline embedding function for the ChromaRAG tests.
+
+Hashes lower-cased word tokens into a fixed-size bag-of-words vector, so documents
+that share words with a query score as similar. That is all the vector tests assert,
+and it needs no model download or transformer forward pass.
+"""
+import re
+import zlib
+
+import numpy as np
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+class LexicalEmbeddingFunction(EmbeddingFunction[Documents]):
+    """Deterministic token-hashing embedder (384-d, like the default MiniLM model)."""
+
+    DIM = 384
+
+    def __init__(self) -> None:
+        pass
+
+    @staticmethod
+    def name() -> str:
+        return "cs-test-lexical"
+
+    def get_config(self) -> dict:
+        return {}
+
+    @staticmethod
+    def build_from_config(config: dict) -> "LexicalEmbeddingFunction":
+        return LexicalEmbeddingFunction()
+
+    def __call__(self, input: Documents) -> Embeddings:
+        vectors = []
+        for text in input:
+            vec = np.zeros(self.DIM, dtype=np.float32)
+            for token in _TOKEN_RE.findall(text.lower()):
+                vec[zlib.crc32(token.encode()) % self.DIM] += 1.0
+            vectors.append(vec)
+        return vectors
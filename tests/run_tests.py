@@ -5,14 +5,19 @@ Comprehensive test runner for Counter-Strike AG2 Agent system.
 This script provides easy access to different test categories and scenarios.
 """
 import argparse
+import importlib.util
 import os
 import subprocess
 import sys
 from pathlib import Path
 
 
-def run_command(cmd, description=""):
-    """Run a command and handle output."""
+def run_command(cmd, description="", replace_process=False):
+    """Run a command and handle output.
+    
+    With replace_process the runner execs the command instead of spawning a child;
+    use it only when nothing else has to run afterwards.
+    """
     if description:
         print(f"\n{'='*60}")
         print(f"Running: {description}")
@@ -20,16 +25,18 @@ def run_command(cmd, description=""):
         print('='*60)
     
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        print(result.stdout)
-        if result.stderr:
-            print("STDERR:", result.stderr)
+        if replace_process:
+            sys.stdout.flush()
+            os.execvp(cmd[0], cmd)
+        # Stream the child's output as it runs instead of buffering the whole log
+        with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                              text=True, bufsize=1) as proc:
+            for line in proc.stdout:
+                sys.stdout.write(line)
+        if proc.returncode != 0:
+            print(f"ERROR: Command failed with exit code {proc.returncode}")
+            return False
         return True
-    except subprocess.CalledProcessError as e:
-        print(f"ERROR: Command failed with exit code {e.returncode}")
-        print("STDOUT:", e.stdout)
-        print("STDERR:", e.stderr)
-        return False
     except FileNotFoundError:
         print(f"ERROR: Command not found: {cmd[0]}")
         print("Make sure pytest is installed: pip install pytest pytest-cov")
@@ -41,10 +48,18 @@ def main():
     parser.add_argument("--category", choices=[
         "all", "core", "agents", "integration", "rag"
     ], default="all", help="Test category to run")
-    parser.add_argument("--coverage", action="store_true", help="Generate coverage report")
+    parser.add_argument("--coverage", action="store_true",
+                        help="Generate coverage report (on by default when CI=true)")
+    parser.add_argument("--no-cov", action="store_true", help="Never collect coverage, even on CI")
     parser.add_argument("--verbose", "-v", action="store_true", help="Verbose output")
     parser.add_argument("--fast", action="store_true", help="Skip slow tests")
     parser.add_argument("--html-cov", action="store_true", help="Generate HTML coverage report")
+    parser.add_argument("--jobs", "-n", default="auto",
+                        help="pytest-xdist worker count ('auto' = one per core, 0 = run serially)")
+    parser.add_argument("--enable-cache", action="store_true",
+                        help="Keep pytest's .pytest_cache (needed for --lf/--ff style reruns)")
+    parser.add_argument("--rerun-keywords", action="store_true",
+                        help="After 'all', re-run the error_path and edge_case marked tests on their own")
     
     args = parser.parse_args()
     
@@ -57,9 +72,20 @@ def main():
         base_cmd.append("-v")
     else:
         base_cmd.append("-q")
+    # The runner never uses --lf/--ff, so skip the cache plugin's reads and writes
+    if not args.enable_cache:
+        base_cmd.extend(["-p", "no:cacheprovider"])
     
-    # Coverage options
-    if args.coverage or args.html_cov:
+    # Parallel workers (pytest-xdist); loadfile keeps each module, and its Chroma temp dir, on one worker
+    if args.jobs != "0" and importlib.util.find_spec("xdist") is not None:
+        base_cmd.extend(["-n", str(args.jobs), "--dist=loadfile"])
+    
+    # Coverage options: tracing slows the embedding tests several-fold, so local runs skip it
+    coverage = (args.coverage or args.html_cov or os.environ.get("CI") == "true") and not args.no_cov
+    if coverage and not args.html_cov and importlib.util.find_spec("slipcover") is not None:
+        # SlipCover's terminal report costs a few percent instead of coverage.py's tracer overhead
+        base_cmd[1:3] = ["-m", "slipcover", "--source", "counter_strike_ag2_agent", "--missing", "-m", "pytest"]
+    elif coverage:
         base_cmd.extend([
             "--cov=counter_strike_ag2_agent",
             "--cov-report=term-missing"
@@ -68,47 +94,44 @@ def main():
             base_cmd.append("--cov-report=html")
     
     success = True
+    # A single pytest run with nothing printed after it can take over this process
+    single_run = not (args.category == "all" and args.rerun_keywords) and not args.html_cov
     
     if args.category == "all":
         print("Running all streamlined tests...")
         cmd = base_cmd + ["tests/"]
-        success = run_command(cmd, "All Essential Tests")
+        success = run_command(cmd, "All Essential Tests", replace_process=single_run)
         
     elif args.category == "core":
         print("Running core functionality tests...")
         cmd = base_cmd + ["tests/test_core.py"]
-        success = run_command(cmd, "Core Functionality Tests")
+        success = run_command(cmd, "Core Functionality Tests", replace_process=single_run)
         
     elif args.category == "agents":
         print("Running AG2 agent tests...")
         cmd = base_cmd + ["tests/test_agents.py", "tests/test_agents_essential.py"]
-        success = run_command(cmd, "AG2 Agent Tests")
+        success = run_command(cmd, "AG2 Agent Tests", replace_process=single_run)
         
     elif args.category == "integration":
         print("Running integration tests...")
         cmd = base_cmd + ["tests/test_integration_essential.py"]
-        success = run_command(cmd, "Integration Tests")
+        success = run_command(cmd, "Integration Tests", replace_process=single_run)
         
     elif args.category == "rag":
         print("Running RAG tests...")
         cmd = base_cmd + ["tests/test_rag.py"]
-        success = run_command(cmd, "RAG Helper Tests")
+        success = run_command(cmd, "RAG Helper Tests", replace_process=single_run)
     
-    # Additional useful test runs
-    if args.category == "all" and success:
+    # Error-path and edge-case tests again, selected by marker in one extra run
+    if args.category == "all" and success and args.rerun_keywords:
         print("\n" + "="*60)
         print("Running additional test scenarios...")
         print("="*60)
         
-        # Test error handling
-        cmd = base_cmd + ["-k", "error or fallback or exception", "-v"]
-        run_command(cmd, "Error Handling Tests")
-        
-        # Test edge cases
-        cmd = base_cmd + ["-k", "edge_case or boundary", "-v"]
-        run_command(cmd, "Edge Case Tests")
+        cmd = base_cmd + ["tests/", "-m", "error_path or edge_case", "-v"]
+        run_command(cmd, "Error Handling and Edge Case Tests")
     
-    if args.html_cov and (args.coverage or args.html_cov):
+    if args.html_cov and coverage:
         print(f"\nHTML coverage report generated in: {Path.cwd() / 'htmlcov' / 'index.html'}")
     
     if success:
@@ -10,6 +10,8 @@ import os
 import unittest
 from unittest.mock import patch
 
+import pytest
+
 from counter_strike_ag2_agent.agents import (
     create_team, create_terrorists_group, get_user_agent,
     _load_config_list, get_active_providers
@@ -22,32 +24,10 @@ class TestEssentialAgents(unittest.TestCase):
     
     def setUp(self):
         self.game_state = GameState()
-        # Clear environment for clean testing
-        self.original_env = {}
+        # Clear provider variables; patch.dict restores the environment after each test
+        self.enterContext(patch.dict(os.environ))
         for key in ['OAI_CONFIG_LIST', 'OPENAI_API_KEY', 'ANTHROPIC_API_KEY']:
-            self.original_env[key] = os.environ.get(key)
-            if key in os.environ:
-                del os.environ[key]
-    
-    def tearDown(self):
-        # Restore original environment
-        for key, value in self.original_env.items():
-            if value is not None:
-                os.environ[key] = value
-            elif key in os.environ:
-                del os.environ[key]
-    
-    def test_config_loading_basic(self):
-        """Test basic configuration loading."""
-        # Test with no config
-        config = _load_config_list()
-        self.assertEqual(config, [])
-        
-        # Test with Anthropic key
-        os.environ['ANTHROPIC_API_KEY'] = 'test-key'
-        config = _load_config_list()
-        self.assertEqual(len(config), 1)
-        self.assertEqual(config[0]['api_type'], 'anthropic')
+            os.environ.pop(key, None)
     
     def test_team_creation_basic(self):
         """Test basic team creation works."""
@@ -62,19 +42,6 @@ class TestEssentialAgents(unittest.TestCase):
             self.assertIsNotNone(user_agent)
             self.assertEqual(user_agent.human_input_mode, "NEVER")
     
-    def test_terrorists_group_creation(self):
-        """Test terrorists group creation with multiple players."""
-        with patch('counter_strike_ag2_agent.agents.USABLE_CONFIG_LIST', []):
-            manager, players = create_terrorists_group(num_players=2)
-            
-            self.assertIsNotNone(manager)
-            self.assertEqual(len(players), 2)
-            self.assertEqual(len(manager.groupchat.agents), 3)  # 2 players + 1 bot
-            
-            # All players should be UserProxyAgent
-            for player in players:
-                self.assertEqual(player.human_input_mode, "NEVER")
-    
     def test_agent_discovery_robust(self):
         """Test robust agent discovery (not hardcoded indices)."""
         with patch('counter_strike_ag2_agent.agents.USABLE_CONFIG_LIST', []):
@@ -101,34 +68,18 @@ class TestEssentialAgents(unittest.TestCase):
             providers = get_active_providers()
             self.assertGreater(len(providers), 0)
             self.assertIn("openai", providers)
-    
-    def test_agent_system_messages(self):
-        """Test agents have appropriate system messages."""
-        with patch('counter_strike_ag2_agent.agents.USABLE_CONFIG_LIST', []):
-            manager = create_team("Terrorists", is_terrorists=True)
-            
-            # Find bot agent
-            bot_agent = None
-            for agent in manager.groupchat.agents:
-                if hasattr(agent, 'system_message'):
-                    bot_agent = agent
-                    break
-            
-            self.assertIsNotNone(bot_agent)
-            # System message should exist and be concise (if configured)
-            if bot_agent.system_message:
-                self.assertIn("short", bot_agent.system_message.lower())
 
 
 class TestAgentErrorHandling(unittest.TestCase):
     """Test agent error handling and fallbacks."""
     
+    @pytest.mark.error_path
     def test_no_config_fallback(self):
         """Test system works without LLM configuration."""
         # Ensure no config available
+        self.enterContext(patch.dict(os.environ))
         for key in ['OAI_CONFIG_LIST', 'OPENAI_API_KEY', 'ANTHROPIC_API_KEY']:
-            if key in os.environ:
-                del os.environ[key]
+            os.environ.pop(key, None)
         
         config = _load_config_list()
         self.assertEqual(config, [])
@@ -137,6 +88,7 @@ class TestAgentErrorHandling(unittest.TestCase):
         manager = create_team("Terrorists", is_terrorists=True)
         self.assertIsNotNone(manager)
     
+    @pytest.mark.edge_case
     def test_minimum_players(self):
         """Test minimum player requirements."""
         manager, players = create_terrorists_group(num_players=0)
@@ -8,14 +8,22 @@ This file consolidates the most critical tests to verify core functionality:
 - Basic system integration
 """
 import os
+import json
 import tempfile
-import shutil
 import unittest
 from unittest.mock import patch
 
+import pytest
+
 from counter_strike_ag2_agent.game_state import GameState
 from counter_strike_ag2_agent.rag import RagTerroristHelper
-from counter_strike_ag2_agent.rag_vector import ChromaRAG
+from counter_strike_ag2_agent.rag_vector import ChromaRAG, release_client
+
+
+def _fast_tmpdir() -> tempfile.TemporaryDirectory:
+    """Temp dir for Chroma persistence, on RAM-backed /dev/shm when it is writable."""
+    base = "/dev/shm" if os.access("/dev/shm", os.W_OK) else None
+    return tempfile.TemporaryDirectory(dir=base, ignore_cleanup_errors=True)
 
 
 class TestCoreGameFunctionality(unittest.TestCase):
@@ -51,6 +59,7 @@ class TestCoreGameFunctionality(unittest.TestCase):
         result = self.game_state.apply_action("Counter-Terrorists", "player", "defuse bomb")
         self.assertTrue("defused" in result or "failed" in result)
     
+    @pytest.mark.error_path
     def test_invalid_actions(self):
         """Test invalid actions are handled properly."""
         result = self.game_state.apply_action("Terrorists", "player", "invalid_action")
@@ -69,31 +78,57 @@ class TestCoreGameFunctionality(unittest.TestCase):
         facts = RagTerroristHelper.build_facts(self.game_state)
         self.assertIn("T dead: player, bot", facts)
 
+    def test_round_over_awards_opponent(self):
+        """Test team elimination ends the round in the opponent's favour."""
+        self.assertFalse(self.game_state.is_round_over())
+        self.game_state.player_health["Counter-Terrorists"]["player"] = 0
+        self.game_state.player_health["Counter-Terrorists"]["bot"] = 0
+        self.assertTrue(self.game_state.is_round_over())
+        self.assertEqual(self.game_state.winner, "Terrorists")
+
+    def test_state_json_cache_invalidation(self):
+        """Test cached state JSON is refreshed after actions and round resets."""
+        first = self.game_state.to_state_json()
+        self.assertIs(first, self.game_state.to_state_json())
+        self.game_state.apply_action("Terrorists", "player", "move to A-site")
+        self.assertIn("A-site", self.game_state.to_state_json())
+        self.game_state.reset_round()
+        self.assertEqual(json.loads(self.game_state.to_state_json())["round"], 2)
+
+    def test_from_dict_round_trip(self):
+        """Test GameState.from_dict restores a snapshot and keeps defaults for missing fields."""
+        self.game_state.apply_action("Terrorists", "player", "plant bomb")
+        restored = GameState.from_dict(json.loads(self.game_state.to_state_json()))
+        self.assertEqual(restored.to_state_dict(), self.game_state.to_state_dict())
+        self.assertEqual(GameState.from_dict({"round": 2}).max_rounds, 3)
+
 
 class TestRAGFunctionality(unittest.TestCase):
     """Test RAG helper and vector knowledge base functionality."""
     
+    @classmethod
+    def setUpClass(cls):
+        # One directory (so one cached client) and embedder per class; each test uses its own collection
+        cls.temp_dir = cls.enterClassContext(_fast_tmpdir())
+        # Imported here so game-state-only runs never load chromadb
+        from lexical_embeddings import LexicalEmbeddingFunction
+        # Word-overlap embeddings: no model download, microseconds per text
+        cls.enterClassContext(patch.object(ChromaRAG, "_embedding_fn", LexicalEmbeddingFunction()))
+    
     def setUp(self):
         self.game_state = GameState()
-        self.temp_dir = tempfile.mkdtemp()
-    
-    def tearDown(self):
-        if os.path.exists(self.temp_dir):
-            shutil.rmtree(self.temp_dir)
     
     def test_rag_helper_basic_responses(self):
         """Test RAG helper provides appropriate responses."""
-        # Test bomb site query
-        answer = RagTerroristHelper.answer("where is the bomb?", self.game_state)
-        self.assertIn("not planted", answer.lower())
-        
-        # Test strategy query
-        answer = RagTerroristHelper.answer("what should we do?", self.game_state)
-        self.assertIn("plant", answer.lower())
-        
-        # Test CT threat query
-        answer = RagTerroristHelper.answer("any ct near?", self.game_state)
-        self.assertIn("presence unknown", answer.lower())
+        cases = [
+            ("where is the bomb?", "not planted"),  # bomb site query
+            ("what should we do?", "plant"),  # strategy query
+            ("any ct near?", "presence unknown"),  # CT threat query
+        ]
+        for question, expected in cases:
+            with self.subTest(question=question):
+                answer = RagTerroristHelper.answer(question, self.game_state)
+                self.assertIn(expected, answer.lower())
     
     def test_rag_helper_with_bomb_planted(self):
         """Test RAG helper adapts to game state changes."""
@@ -129,26 +164,33 @@ class TestRAGFunctionality(unittest.TestCase):
     
     def test_vector_knowledge_persistence(self):
         """Test vector knowledge base persists data."""
-        rag1 = ChromaRAG(persist_dir=self.temp_dir, collection="test_persist")
-        rag1.add_texts(["Persistent tactical knowledge"])
-        
-        # Create new instance to test persistence
-        rag2 = ChromaRAG(persist_dir=self.temp_dir, collection="test_persist")
-        answer = rag2.ask("tactical knowledge")
-        self.assertIsNotNone(answer)
-        self.assertIn("Persistent", answer)
+        # Own directory, so releasing its client leaves the class-wide one untouched
+        with _fast_tmpdir() as persist_dir:
+            rag1 = ChromaRAG(persist_dir=persist_dir, collection="test_persist")
+            rag1.add_texts(["Persistent tactical knowledge"])
+            # Drop the cached client so the reopen below reads back from disk
+            release_client(persist_dir)
+
+            rag2 = ChromaRAG(persist_dir=persist_dir, collection="test_persist")
+            try:
+                answer = rag2.ask("tactical knowledge")
+            finally:
+                release_client(persist_dir)
+            self.assertIsNotNone(answer)
+            self.assertIn("Persistent", answer)
 
 
 class TestSystemIntegration(unittest.TestCase):
     """Test key system integration scenarios."""
     
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = cls.enterClassContext(_fast_tmpdir())
+        from lexical_embeddings import LexicalEmbeddingFunction
+        cls.enterClassContext(patch.object(ChromaRAG, "_embedding_fn", LexicalEmbeddingFunction()))
+    
     def setUp(self):
         self.game_state = GameState()
-        self.temp_dir = tempfile.mkdtemp()
-    
-    def tearDown(self):
-        if os.path.exists(self.temp_dir):
-            shutil.rmtree(self.temp_dir)
     
     def test_complete_game_workflow(self):
         """Test a complete game workflow."""
@@ -181,6 +223,7 @@ class TestSystemIntegration(unittest.TestCase):
         rag_answer = RagTerroristHelper.answer("what should we do?", self.game_state)
         self.assertIn("crossfire", rag_answer.lower())
     
+    @pytest.mark.error_path
     def test_error_handling(self):
         """Test system handles errors gracefully."""
         # Test invalid game actions